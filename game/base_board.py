@@ -1,12 +1,35 @@
 import numpy as np
 from game.cons import GAME_PLAYER
+from game.line_table import get_line_windows
+from game.threat_index import ThreatIndex
+from game.zobrist import get_symmetry_zobrist_keys
 from typing import Optional, Tuple, List
 from loguru import logger
 import random
-import copy
 
 
 Debug = False
+# planes of last_ten_board, last_five_current_board and last_five_opposite_board have half of it
+HISTORY_STEPS = 10
+
+
+def get_history_layout(history_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    layout of last_ten_board, last_five_current_board, last_five_opposite_board in the circular buffer of history
+    planes, plane j is in slot j % history_size for board planes, history_size + j % history_size for last move planes
+    :return: plane offsets from the step number, slot base of the planes, signs of the planes
+    """
+    half = HISTORY_STEPS // 2
+    offsets = np.concatenate([
+        np.arange(1 - HISTORY_STEPS, 1),
+        np.arange(1 - HISTORY_STEPS, 0, 2),
+        np.arange(2 - HISTORY_STEPS, 1, 2)
+    ])
+    base = np.repeat([0, history_size, history_size], [HISTORY_STEPS, half, half])
+    # the planes of last ten board are negated after every move, last five current is the negative of last five
+    # opposite of previous move
+    sign = np.concatenate([(-1.) ** np.arange(HISTORY_STEPS - 1, -1, -1), -np.ones(half), np.ones(half)])
+    return offsets, base, sign
 
 
 class ChessBoard(object):
@@ -23,6 +46,8 @@ class ChessBoard(object):
         self.board = np.zeros((row, col), dtype=int)
         self.empty_board = np.ones((row, col), dtype=np.float)
         self.steps = []
+        # undo records of push, see pop
+        self.move_stack = []
 
         # status variable
         self.current_player = GAME_PLAYER.EMPTY
@@ -34,9 +59,20 @@ class ChessBoard(object):
         self.winner = None
 
         # variables for transformer
-        self.last_ten_board = None
-        self.last_five_current_board = None
-        self.last_five_opposite_board = None
+        # circular buffer of history planes, plane j (the j-th move has been made) is in slot j % history_size:
+        # [0, history_size): board before move j from the view of the player of move j
+        # [history_size, 2 * history_size): -1 at the position of move j - 1
+        # only the planes of the last HISTORY_STEPS + 1 moves are needed, push records the planes it overwrites
+        self.history_size = HISTORY_STEPS + 2
+        self.history_planes = np.zeros((2 * self.history_size, row, col), dtype=np.float64)
+        self.history_offsets, self.history_base, self.history_sign = get_history_layout(self.history_size)
+        self.history_sign = self.history_sign[:, None, None]
+
+        # threat points of both players, see search_current_player_certain_step
+        self.threat_index = ThreatIndex(row, col, goal_chess_num)
+        # zobrist hash of the board after each symmetry, the first one is the board itself
+        self.symmetry_hash_keys = get_symmetry_zobrist_keys(row, col)
+        self.symmetry_hashes = None
 
         self.reset()
 
@@ -49,10 +85,15 @@ class ChessBoard(object):
         self.current_player = GAME_PLAYER.PLAYER_ONE
         self.oppo_player = GAME_PLAYER.PLAYER_TWO
         self.steps = []
+        self.move_stack = []
+        self.threat_index.reset()
+        self.symmetry_hashes = [0] * len(self.symmetry_hash_keys[GAME_PLAYER.PLAYER_ONE][0])
         # variables for transformer
-        self.last_ten_board = np.array([np.zeros((self.row, self.col)) for _ in range(10)], dtype=np.float)
-        self.last_five_current_board = np.array([np.zeros((self.row, self.col), dtype=int) for _ in range(5)], dtype=np.float)
-        self.last_five_opposite_board = np.array([np.zeros((self.row, self.col), dtype=int) for _ in range(5)], dtype=np.float)
+        # 开局前的空白层: 每步取反一次, 第j层为 (-1) ** j * 0.
+        for j in range(1 - HISTORY_STEPS, 1):
+            self.history_planes[j % self.history_size] = -0. if j % 2 else 0.
+            self.history_planes[self.history_size + j % self.history_size] = -0. if j % 2 else 0.
+        self.update_next_window_step()
 
     def move(self, mv_row: int, mv_col: int) -> Tuple[int, Optional[GAME_PLAYER]]:
         """
@@ -63,21 +104,87 @@ class ChessBoard(object):
         if self.game_end:
             logger.error('Game is not reset !')
             return -1, None
-        if self.board[mv_row, mv_col] != GAME_PLAYER.EMPTY:
+        if not self.is_empty(mv_row, mv_col):
             logger.error(f'board already has a chess in {mv_row, mv_col}')
             return -1, None
         self.update_last_window_step(mv_row, mv_col)
-        self.board[mv_row, mv_col] = self.current_player
+        self.place_chess(mv_row, mv_col, self.current_player)
+        self.threat_index.update(mv_row * self.col + mv_col, self.current_player)
+        self.update_hash(mv_row, mv_col, self.current_player)
         self.empty_board[mv_row, mv_col] = -10
-        has_winner, _ = self.is_player_winner(self.current_player, self.board, self.goal_chess_num)
+        has_winner = self.is_last_move_winner(mv_row, mv_col)
         if has_winner == 0:
             self.reverse_player()
+            self.update_next_window_step()
             return 0, None
         else:
             self.game_end = True
             self.winner = GAME_PLAYER.PLAYER_TWO if has_winner == 2 else self.current_player
+            self.update_next_window_step()
             return has_winner, self.winner
 
+    def push(self, mv_row: int, mv_col: int) -> Tuple[int, Optional[GAME_PLAYER]]:
+        """
+        same as move, but the move can be taken back by pop
+        """
+        # 记录move会覆盖的状态，包括落子后写入的历史窗口缓冲区位置上原来的两层
+        slot = (len(self.steps) + 2) % self.history_size
+        record = (self.current_player, self.oppo_player, self.current_move, self.last_move, self.winner,
+                  self.game_end, slot, self.history_planes[[slot, self.history_size + slot]])
+        status, winner = self.move(mv_row, mv_col)
+        if status != -1:
+            self.move_stack.append(record)
+        return status, winner
+
+    def pop(self) -> Tuple[int, int]:
+        """
+        take back the last move made by push
+        :return: the position of the move
+        """
+        if len(self.move_stack) == 0:
+            raise ValueError("no move to pop!")
+        (self.current_player, self.oppo_player, self.current_move, self.last_move, self.winner,
+         self.game_end, slot, planes) = self.move_stack.pop()
+        self.history_planes[[slot, self.history_size + slot]] = planes
+        r, c = self.steps.pop()
+        self.update_hash(r, c, self.get_chess_value(r, c))
+        self.remove_chess(r, c)
+        self.threat_index.update(r * self.col + c, GAME_PLAYER.EMPTY)
+        self.empty_board[r, c] = 0
+        return r, c
+
+    def place_chess(self, r, c, player):
+        self.board[r, c] = player
+
+    def remove_chess(self, r, c):
+        self.board[r, c] = GAME_PLAYER.EMPTY
+
+    def update_hash(self, r, c, player):
+        hashes = self.symmetry_hashes
+        for i, key in enumerate(self.symmetry_hash_keys[player][r * self.col + c]):
+            hashes[i] ^= key
+
+    @property
+    def zobrist_hash(self) -> int:
+        """
+        64 bit zobrist hash of the stones on the board
+        """
+        return self.symmetry_hashes[0]
+
+    @property
+    def canonical_hash(self) -> int:
+        """
+        the same for all positions which are rotations or flips of each other
+        """
+        return min(self.symmetry_hashes)
+
+    def get_canonical_symmetry(self) -> Tuple[int, int]:
+        """
+        :return: canonical hash, index of the symmetry (see game.zobrist.get_symmetry_maps) which gives the hash
+        """
+        canonical = min(self.symmetry_hashes)
+        return canonical, self.symmetry_hashes.index(canonical)
+
     def get_valid_board(self):
         return self.empty_board
 
@@ -89,29 +196,46 @@ class ChessBoard(object):
     def update_last_window_step(self, r, c):
         self.current_move = r, c
         self.steps.append(self.current_move)
-        # update last window
-        tmp_board = np.array(self.board, dtype=np.float)
-        tmp_board[tmp_board == self.current_player] = 100
-        tmp_board[tmp_board == self.oppo_player] = -100
-        tmp_board /= 100
-        self.last_ten_board[:-1] = -self.last_ten_board[1:]
-        self.last_ten_board[-1] = tmp_board
-
-        # update last five
-        self.last_five_current_board, self.last_five_opposite_board = -self.last_five_opposite_board, -self.last_five_current_board
-        # update last five opposite
-        oppo_tmp = np.zeros((self.row, self.col), dtype=int)
-        if self.last_move is not None:
-            oppo_tmp[self.last_move] = -1
-        self.last_five_opposite_board[:-1] = self.last_five_opposite_board[1:]
-        self.last_five_opposite_board[-1] = oppo_tmp
         self.last_move = self.current_move
-        # update end
+
+    def update_next_window_step(self):
+        """
+        write the history planes of the next move: the board from the view of current player and -1 at last move
+        """
+        slot = (len(self.steps) + 1) % self.history_size
+        np.multiply(self.board, int(self.current_player), out=self.history_planes[slot], casting='unsafe')
+        oppo_plane = self.history_planes[self.history_size + slot]
+        oppo_plane.fill(0.)
+        if self.last_move is not None:
+            oppo_plane[self.last_move] = -1
+
+    def get_history_planes(self, step_num):
+        """
+        :return: last_ten_board, last_five_current_board, last_five_opposite_board after step_num moves,
+        gathered from the circular buffer with one take
+        """
+        planes = self.history_planes.take((self.history_offsets + step_num) % self.history_size + self.history_base,
+                                          axis=0)
+        planes *= self.history_sign
+        half = HISTORY_STEPS // 2
+        return planes[:HISTORY_STEPS], planes[HISTORY_STEPS:HISTORY_STEPS + half], planes[HISTORY_STEPS + half:]
+
+    @property
+    def last_ten_board(self):
+        return self.get_history_planes(len(self.steps))[0]
+
+    @property
+    def last_five_current_board(self):
+        return self.get_history_planes(len(self.steps))[1]
+
+    @property
+    def last_five_opposite_board(self):
+        return self.get_history_planes(len(self.steps))[2]
 
     def get_last_train_window_output(self):
         label = None if self.winner is None else 1
-        return np.array(self.last_ten_board), np.array(self.last_five_current_board), np.array(
-            self.last_five_opposite_board), self.current_move, label
+        last_ten_board, last_five_current_board, last_five_opposite_board = self.get_history_planes(len(self.steps))
+        return last_ten_board, last_five_current_board, last_five_opposite_board, self.current_move, label
 
     def get_last_pred_window_output(self):
         """
@@ -120,175 +244,78 @@ class ChessBoard(object):
         me: [1, half last_steps, board_size, board_size]
         oppo: [1, half last_steps, board_size, board_size]
         """
-
-        last_ten_board = copy.deepcopy(self.last_ten_board)
-        tmp_board = np.array(self.board, dtype=np.float)
-        tmp_board[tmp_board == self.current_player] = 100
-        tmp_board[tmp_board == self.oppo_player] = -100
-        tmp_board /= 100
-        last_ten_board[:-1] = -last_ten_board[1:]
-        last_ten_board[-1] = tmp_board
-        # update last five
-        last_five_current_board, last_five_opposite_board = copy.deepcopy(
-            -self.last_five_opposite_board), copy.deepcopy(-self.last_five_current_board)
-        oppo_tmp = np.zeros((self.row, self.col), dtype=int)
-        if self.last_move is not None:
-            oppo_tmp[self.last_move] = -1
-        last_five_opposite_board[:-1] = last_five_opposite_board[1:]
-        last_five_opposite_board[-1] = oppo_tmp
-        return np.expand_dims(last_ten_board, axis=0), np.expand_dims(last_five_current_board, axis=0), np.expand_dims(
-            last_five_opposite_board, axis=0)
+        # 下一步的各层在上一步落子后已经写入缓冲区
+        last_ten_board, last_five_current_board, last_five_opposite_board = self.get_history_planes(
+            len(self.steps) + 1)
+        return last_ten_board[None], last_five_current_board[None], last_five_opposite_board[None]
 
     def search_current_player_certain_step(self) -> List[Tuple[int, int]]:
+        """
+        the points are read from self.threat_index, which is updated by each move
+        """
+        index = self.threat_index
         # 1查看自己是否会获胜
-        _, next_steps = self.is_player_winner(self.current_player, self.board, self.goal_chess_num - 1)
+        next_steps = index.get_points(index.WIN, self.current_player)
         if len(next_steps) > 0:
             if Debug:
                 print("certain_step1")
-            return next_steps
+            return self._cells_to_steps(next_steps, self.col)
         # 2查看对手是否会马上获胜
-        _, next_steps = self.is_player_winner(self.oppo_player, self.board, self.goal_chess_num - 1)
+        next_steps = index.get_points(index.WIN, self.oppo_player)
         if len(next_steps) > 0:
             if Debug:
                 print("certain_step2")
-            return next_steps
+            return self._cells_to_steps(next_steps, self.col)
         # 3查看自己是否有活三
-        next_steps = self.search_player_livefour_step(self.board, self.current_player, self.oppo_player)
+        next_steps = index.get_points(index.LIVE_FOUR, self.current_player)
         if len(next_steps) > 0:
             if Debug:
                 print("certain_step3")
-            return next_steps
+            return self._cells_to_steps(next_steps, self.col)
         # 4查看对手是否有活三、以及自己是否有半死三
-        next_steps = self.search_player_livefour_step(self.board, self.oppo_player, self.current_player, False)
+        next_steps = index.get_points(index.LIVE_FOUR_DEFEND, self.oppo_player)
         if len(next_steps) > 0:
-            next_steps2 = self.search_player_one_side_four_step(self.board, self.current_player, self.oppo_player)
+            next_steps2 = index.get_points(index.ONE_SIDE_FOUR, self.current_player)
             if Debug:
                 print("next1", next_steps, "next2", next_steps2)
                 print("certain_step4")
-            return list(set(next_steps + next_steps2))
+            return self._cells_to_steps(next_steps | next_steps2, self.col)
         return []
 
-    def check_board_livethree(self, check_board, player, oppo, current=True) -> List[int]:
-        if check_board[0] == oppo or check_board[-1] == oppo:
-            return []
-        codes = []
-        board_status = check_board[1:-1] == player
-        if np.sum(board_status) >= self.goal_chess_num - 2:
-            ids, = np.where(board_status == GAME_PLAYER.EMPTY)
-            codes.append(1 + ids[0])
-            if not current:
-                if ids[0] == 1 or ids[0] == 2:
-                    if check_board[ids[0] + 1] != oppo:
-                        codes.append(0)
-                        codes.append(len(check_board) - 1)
-        return codes
-
-    def check_board_one_step_four(self, board, player):
-        ids = None
-        if player == GAME_PLAYER.PLAYER_ONE and np.sum(board) >= self.goal_chess_num - 2:
-            ids, = np.where(board == GAME_PLAYER.EMPTY)
-        elif player == GAME_PLAYER.PLAYER_TWO and np.sum(board) <= -(self.goal_chess_num - 2):
-            ids, = np.where(board == GAME_PLAYER.EMPTY)
-        return ids
-
     def search_player_one_side_four_step(self, board, player, oppo) -> List[Tuple[int, int]]:
+        """
+        所有长度为goal_chess_num的窗口中，player与oppo棋子数之差不少于goal_chess_num - 2时，窗口中的空位
+        """
         row, col = board.shape
-        four_in_line_steps = set()
-        # 1. 判断是否横向连续五子
-        for x in range(row - self.goal_chess_num + 1):
-            for y in range(col):
-                check_board = board[x: x + self.goal_chess_num, y]
-                codes = self.check_board_one_step_four(check_board, player)
-                if codes is not None and len(codes) > 0:
-                    for code in codes:
-                        four_in_line_steps.add((x + code, y))
-
-        # 2. 判断是否纵向连续五子
-        for x in range(row):
-            for y in range(col - self.goal_chess_num + 1):
-                check_board = board[x, y: y + self.goal_chess_num]
-                codes = self.check_board_one_step_four(check_board, player)
-                if codes is not None and len(codes) > 0:
-                    for code in codes:
-                        four_in_line_steps.add((x, y + code))
-
-        # 3. 判断有斜五子
-        for x in range(row - self.goal_chess_num + 1):
-            for y in range(col - self.goal_chess_num + 1):
-                # 判断是否有左上 - 右下的连续五子
-                index_x = [x + delta for delta in range(self.goal_chess_num)]
-                index_y = [y + delta for delta in range(self.goal_chess_num)]
-                check_board = board[index_x, index_y]
-                codes = self.check_board_one_step_four(check_board, player)
-                if codes is not None and len(codes) > 0:
-                    for code in codes:
-                        four_in_line_steps.add((x + code, y + code))
-
-                # 判断是否有右上-左下的连续五子
-                index_x = [x + delta for delta in range(self.goal_chess_num)]
-                index_y = [y + delta for delta in range(self.goal_chess_num - 1, -1, -1)]
-                check_board = board[index_x, index_y]
-                codes = self.check_board_one_step_four(check_board, player)
-                if codes is not None and len(codes) > 0:
-                    for code in codes:
-                        four_in_line_steps.add((x + code, y + self.goal_chess_num - 1 - code))
-        return list(four_in_line_steps)
+        windows = get_line_windows(row, col, self.goal_chess_num)
+        flat = board.ravel()
+        check_board = flat[windows]
+        status = check_board.sum(axis=1) * player >= self.goal_chess_num - 2
+        steps = windows[(check_board == GAME_PLAYER.EMPTY) & status[:, None]]
+        return self._cells_to_steps(np.unique(steps).tolist(), col)
 
     def search_player_livefour_step(self, board, player, oppo, current=True) -> List[Tuple[int, int]]:
+        """
+        长度为goal_chess_num + 1的窗口，两端不是oppo，中间有goal_chess_num - 2个player棋子时，返回中间第一个空缺位置;
+        current为False时，若空缺位于中间第二、三个位置且不是oppo，窗口两端也一起返回
+        """
         row, col = board.shape
-        four_in_line_steps = set()
-
-        # 1. 判断是否横向连续五子
-        for x in range(row - self.goal_chess_num):
-            for y in range(col):
-                check_board = board[x: x + self.goal_chess_num + 1, y]
-                codes = self.check_board_livethree(check_board, player, oppo, current)
-                if len(codes) > 0:
-                    for code in codes:
-                        if self.is_empty(x + code, y):
-                            if Debug:
-                                print("livefour1")
-                                print("x, y:", x, y, board[x: x + self.goal_chess_num + 1, y])
-                                print("player", player, oppo)
-                                print("codes:", codes)
-                            four_in_line_steps.add((x + code, y))
-
-        # 2. 判断是否纵向连续五子
-        for x in range(row):
-            for y in range(col - self.goal_chess_num):
-                check_board = board[x, y: y + self.goal_chess_num + 1]
-                codes = self.check_board_livethree(check_board, player, oppo, current)
-                if len(codes) > 0:
-                    for code in codes:
-                        if self.is_empty(x, y + code):
-                            if Debug:
-                                print("livefour2")
-                            four_in_line_steps.add((x, y + code))
-
-        # 3. 判断有斜五子
-        for x in range(row - self.goal_chess_num):
-            for y in range(col - self.goal_chess_num):
-                # 判断是否有左上 - 右下的连续五子
-                index_x = [x + delta for delta in range(self.goal_chess_num + 1)]
-                index_y = [y + delta for delta in range(self.goal_chess_num + 1)]
-                check_board = board[index_x, index_y]
-                codes = self.check_board_livethree(check_board, player, oppo, current)
-                if len(codes) > 0:
-                    for code in codes:
-                        if self.is_empty(x + code, y + code):
-                            four_in_line_steps.add((x + code, y + code))
-
-                # 判断是否有右上-左下的连续五子
-                index_x = [x + delta for delta in range(self.goal_chess_num + 1)]
-                index_y = [y + delta for delta in range(self.goal_chess_num, -1, -1)]
-                check_board = board[index_x, index_y]
-                codes = self.check_board_livethree(check_board, player, oppo, current)
-                if len(codes) > 0:
-                    for code in codes:
-                        if self.is_empty(x + code, y + self.goal_chess_num - code):
-                            four_in_line_steps.add((x + code, y + self.goal_chess_num - code))
-
-        return list(four_in_line_steps)
+        windows = get_line_windows(row, col, self.goal_chess_num + 1)
+        flat = board.ravel()
+        check_board = flat[windows]
+        inner = check_board[:, 1:-1] == player
+        status = (check_board[:, 0] != oppo) & (check_board[:, -1] != oppo)
+        status &= inner.sum(axis=1) >= self.goal_chess_num - 2
+        ids, = np.nonzero(status)
+        gap = inner[ids].argmin(axis=1) + 1
+        steps = windows[ids, gap]
+        if not current:
+            both_side = ((gap == 2) | (gap == 3)) & (check_board[ids, gap] != oppo)
+            steps = np.concatenate([steps, windows[ids[both_side], 0], windows[ids[both_side], -1]])
+        steps = steps[flat[steps] == GAME_PLAYER.EMPTY]
+        if Debug and len(steps) > 0:
+            print("livefour", "player", player, oppo, "steps:", self._cells_to_steps(steps.tolist(), col))
+        return self._cells_to_steps(np.unique(steps).tolist(), col)
 
     def is_player_winner(self, player, board, goal_num) -> Tuple[int, List]:
         """
@@ -299,58 +326,17 @@ class ChessBoard(object):
         :return: 是否已经获胜 0: 未获胜 1: 获胜 2: 平局
         """
         row, col = board.shape
-        # 1. 判断是否横向连续五子
-        status = 0
+        windows = get_line_windows(row, col, self.goal_chess_num)
+        flat = board.ravel()
+        # 所有横向、纵向、斜向窗口一起判断
+        board_status = flat[windows] == player
+        ids, = np.nonzero(board_status.sum(axis=1) >= goal_num)
+        status = 1 if len(ids) > 0 else 0
         win_steps = []
-        for x in range(row - self.goal_chess_num + 1):
-            for y in range(col):
-                board_status = board[x: x + self.goal_chess_num, y] == player
-                if np.sum(board_status) >= goal_num:
-                    if status <= 0:
-                        status = 1
-                    if goal_num != self.goal_chess_num:
-                        ids, = np.where(board_status == 0)
-                        if self.is_empty(x + ids[0], y):
-                            win_steps.append((x + ids[0], y))
-
-        # 2. 判断是否纵向连续五子
-        for x in range(row):
-            for y in range(col - self.goal_chess_num + 1):
-                board_status = board[x, y: y + self.goal_chess_num] == player
-                if np.sum(board_status) >= goal_num:
-                    if status <= 0:
-                        status = 1
-                    if goal_num != self.goal_chess_num:
-                        ids, = np.where(board_status == 0)
-                        if self.is_empty(x, y + ids[0]):
-                            win_steps.append((x, y + ids[0]))
-
-        # 3. 判断有斜五子
-        for x in range(row - self.goal_chess_num + 1):
-            for y in range(col - self.goal_chess_num + 1):
-                # 判断是否有左上 - 右下的连续五子
-                index_x = [x + delta for delta in range(self.goal_chess_num)]
-                index_y = [y + delta for delta in range(self.goal_chess_num)]
-                board_status = board[index_x, index_y] == player
-                if np.sum(board_status) >= goal_num:
-                    if status <= 0:
-                        status = 1
-                    if goal_num != self.goal_chess_num:
-                        ids, = np.where(board_status == 0)
-                        if self.is_empty(x + ids[0], y + ids[0]):
-                            win_steps.append((x + ids[0], y + ids[0]))
-
-                # 判断是否有右上-左下的连续五子
-                index_x = [x + delta for delta in range(self.goal_chess_num)]
-                index_y = [y + delta for delta in range(self.goal_chess_num - 1, -1, -1)]
-                board_status = board[index_x, index_y] == player
-                if np.sum(board_status) >= goal_num:
-                    if status <= 0:
-                        status = 1
-                    if goal_num != self.goal_chess_num:
-                        ids, = np.where(board_status == 0)
-                        if self.is_empty(x + ids[0], y + self.goal_chess_num - 1 - ids[0]):
-                            win_steps.append((x + ids[0], y + self.goal_chess_num - 1 - ids[0]))
+        if goal_num != self.goal_chess_num and len(ids) > 0:
+            # 窗口中第一个不属于player的位置
+            steps = windows[ids, board_status[ids].argmin(axis=1)]
+            win_steps = self._cells_to_steps(steps[flat[steps] == GAME_PLAYER.EMPTY].tolist(), col)
 
         # 4. 判断是否为平局
         if (board[...] != GAME_PLAYER.EMPTY).all():  # 棋盘中没有剩余的格子，判断为平局
@@ -359,6 +345,31 @@ class ChessBoard(object):
 
         return status, win_steps
 
+    @staticmethod
+    def _cells_to_steps(cells, col) -> List[Tuple[int, int]]:
+        return [divmod(cell, col) for cell in cells]
+
+    def is_last_move_winner(self, r, c) -> int:
+        """
+        只检查经过最后一手(r, c)的四条线，结果与 is_player_winner 对整个棋盘的判断一致
+        (此前的棋盘上不可能已经存在五连)
+        :return: 0: 未获胜 1: 获胜 2: 平局
+        """
+        player = self.board[r, c]
+        for dr, dc in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            chess_num = 1
+            for sign in (1, -1):
+                x, y = r + sign * dr, c + sign * dc
+                while 0 <= x < self.row and 0 <= y < self.col and self.board[x, y] == player:
+                    chess_num += 1
+                    x, y = x + sign * dr, y + sign * dc
+            if chess_num >= self.goal_chess_num:
+                return 1
+        # 每一步都会记录在steps中，步数等于格子数时棋盘已满，判断为平局
+        if len(self.steps) >= self.row * self.col:
+            return 2
+        return 0
+
     def reverse_player(self):
         if self.game_end:
             raise ValueError("game end is True!")
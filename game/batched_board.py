@@ -0,0 +1,158 @@
+import numpy as np
+from game.base_board import HISTORY_STEPS, get_history_layout
+from game.cons import GAME_PLAYER
+from typing import Optional, Tuple
+
+
+class BatchedChessBoard(object):
+    """
+    batch_size independent chess boards stored in one [batch_size, row, col] array, every board of the batch is
+    moved with one call. The rules and the transformer inputs are the same as ChessBoard.
+    """
+    def __init__(self, batch_size: int, row: int, col: int, goal_chess_num: int = 5, random_alpha=10,
+                 auto_reset=True, collect_train_data=False):
+        """
+        :param auto_reset: reset the finished boards at the end of move
+        :param collect_train_data: keep the train window output of each move before the finished boards are reset
+        """
+        assert row >= goal_chess_num and col >= goal_chess_num
+        self.batch_size = batch_size
+        self.alpha = random_alpha
+        self.row = row
+        self.col = col
+        self.goal_chess_num = goal_chess_num
+        self.auto_reset = auto_reset
+        self.collect_train_data = collect_train_data
+        self.train_window_output = None
+        self.batch_ids = np.arange(batch_size)
+
+        self.board = np.zeros((batch_size, row, col), dtype=int)
+        self.empty_board = np.zeros((batch_size, row, col), dtype=np.float64)
+        self.current_player = np.zeros(batch_size, dtype=int)
+        self.step_num = np.zeros(batch_size, dtype=int)
+        self.last_move = np.zeros((batch_size, 2), dtype=int)
+        self.game_end = np.zeros(batch_size, dtype=bool)
+        self.winner = np.zeros(batch_size, dtype=int)
+
+        # 经过每个格子的四条线(长度为2 * goal_chess_num - 1)，超出棋盘的位置指向最后一个始终为空的格子
+        cell_num = row * col
+        length = goal_chess_num - 1
+        delta = np.arange(-length, length + 1)
+        lines = []
+        for r in range(row):
+            for c in range(col):
+                for dr, dc in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                    line_r, line_c = r + dr * delta, c + dc * delta
+                    inside = (line_r >= 0) & (line_r < row) & (line_c >= 0) & (line_c < col)
+                    lines.append(np.where(inside, line_r * col + line_c, cell_num))
+        self.cell_lines = np.array(lines).reshape(cell_num, 4, len(delta))
+
+        # history planes, only the planes of the last HISTORY_STEPS + 1 moves are kept (see ChessBoard.history_planes)
+        self.history_size = HISTORY_STEPS + 2
+        self.history_planes = np.zeros((batch_size, 2 * self.history_size, row, col), dtype=np.float64)
+        self.history_offsets, self.history_base, self.history_sign = get_history_layout(self.history_size)
+        self.history_sign = self.history_sign[:, None, None]
+
+        self.reset()
+
+    def reset(self, ids: Optional[np.ndarray] = None):
+        """
+        :param ids: ids of the boards to reset, all boards if None
+        """
+        if ids is None:
+            ids = self.batch_ids
+        self.board[ids] = GAME_PLAYER.EMPTY
+        self.empty_board[ids] = 0
+        self.current_player[ids] = GAME_PLAYER.PLAYER_ONE
+        self.step_num[ids] = 0
+        self.last_move[ids] = -1
+        self.game_end[ids] = False
+        self.winner[ids] = GAME_PLAYER.EMPTY
+        for j in range(1 - HISTORY_STEPS, 2):
+            value = -0. if j % 2 and j <= 0 else 0.
+            self.history_planes[ids, j % self.history_size] = value
+            self.history_planes[ids, self.history_size + j % self.history_size] = value
+
+    def move(self, mv_rows: np.ndarray, mv_cols: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        one move on every board
+        :return: status, winner of each board, the same as ChessBoard.move, winner is 0 if the game goes on.
+        the finished boards are reset after the move if auto_reset is True
+        """
+        mv_rows = np.asarray(mv_rows, dtype=int)
+        mv_cols = np.asarray(mv_cols, dtype=int)
+        status = np.full(self.batch_size, -1, dtype=int)
+        winner = np.zeros(self.batch_size, dtype=int)
+        ids, = np.nonzero(~self.game_end & (self.board[self.batch_ids, mv_rows, mv_cols] == GAME_PLAYER.EMPTY))
+        if len(ids) == 0:
+            return status, winner
+        rows, cols, player = mv_rows[ids], mv_cols[ids], self.current_player[ids]
+        self.board[ids, rows, cols] = player
+        self.empty_board[ids, rows, cols] = -10
+        self.step_num[ids] += 1
+        self.last_move[ids, 0] = rows
+        self.last_move[ids, 1] = cols
+
+        # 只检查经过落子位置的四条线
+        flat = np.concatenate([self.board[ids].reshape(len(ids), -1), np.zeros((len(ids), 1), dtype=int)], axis=1)
+        lines = flat[np.arange(len(ids))[:, None, None], self.cell_lines[rows * self.col + cols]]
+        chess_num = np.cumsum(lines == player[:, None, None], axis=-1)
+        chess_num = np.concatenate([np.zeros(chess_num.shape[:-1] + (1,), dtype=int), chess_num], axis=-1)
+        win = (chess_num[..., self.goal_chess_num:] - chess_num[..., :-self.goal_chess_num]
+               >= self.goal_chess_num).any(axis=(1, 2))
+        tie = ~win & (self.step_num[ids] >= self.row * self.col)
+        status[ids] = np.where(win, 1, np.where(tie, 2, 0))
+        winner[ids] = np.where(win, player, np.where(tie, GAME_PLAYER.PLAYER_TWO, GAME_PLAYER.EMPTY))
+        self.game_end[ids] = win | tie
+        self.winner[ids] = winner[ids]
+        self.current_player[ids] = np.where(win | tie, player, -player)
+        self.update_next_window_step(ids)
+
+        if self.collect_train_data:
+            self.train_window_output = self.get_history_planes(self.step_num)
+        if self.auto_reset:
+            self.reset(np.nonzero(self.game_end)[0])
+        return status, winner
+
+    def update_next_window_step(self, ids: np.ndarray):
+        slots = (self.step_num[ids] + 1) % self.history_size
+        self.history_planes[ids, slots] = self.board[ids] * self.current_player[ids, None, None]
+        self.history_planes[ids, self.history_size + slots] = 0.
+        self.history_planes[ids, self.history_size + slots, self.last_move[ids, 0], self.last_move[ids, 1]] = -1
+
+    def get_history_planes(self, step_num: np.ndarray):
+        slots = (self.history_offsets + step_num[:, None]) % self.history_size + self.history_base
+        planes = self.history_planes[self.batch_ids[:, None], slots]
+        planes *= self.history_sign
+        half = HISTORY_STEPS // 2
+        return planes[:, :HISTORY_STEPS], planes[:, HISTORY_STEPS:HISTORY_STEPS + half], \
+            planes[:, HISTORY_STEPS + half:]
+
+    def get_last_train_window_output(self):
+        """
+        :return: board, me, oppo of every board after the last move, see ChessBoard.get_last_train_window_output
+        """
+        if self.collect_train_data and self.train_window_output is not None:
+            return self.train_window_output
+        return self.get_history_planes(self.step_num)
+
+    def get_last_pred_window_output(self):
+        """
+        :return:
+        board: [batch_size, last_steps, board_size, board_size]
+        me: [batch_size, half last_steps, board_size, board_size]
+        oppo: [batch_size, half last_steps, board_size, board_size]
+        """
+        return self.get_history_planes(self.step_num + 1)
+
+    def get_valid_board(self):
+        return self.empty_board
+
+    def get_random_first_step(self) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.round(np.random.beta(self.alpha, self.alpha, self.batch_size) * self.row).astype(int)
+        cols = np.round(np.random.beta(self.alpha, self.alpha, self.batch_size) * self.col).astype(int)
+        return np.minimum(rows, self.row - 1), np.minimum(cols, self.col - 1)
+
+    @property
+    def shape(self):
+        return self.board.shape
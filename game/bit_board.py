@@ -0,0 +1,200 @@
+from game.base_board import ChessBoard
+from game.cons import GAME_PLAYER
+from game.line_table import get_line_windows, get_cell_windows
+from functools import lru_cache
+from typing import Tuple, List
+import numpy as np
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # python < 3.10
+    def popcount(x: int) -> int:
+        return bin(x).count("1")
+
+
+def lowest_bit_index(x: int) -> int:
+    return (x & -x).bit_length() - 1
+
+
+def iter_bit_index(x: int):
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+def get_bit_array(bits: int, cell_num: int) -> np.ndarray:
+    """
+    :return: uint8 array of cell_num cells, cell i is bit i of bits
+    """
+    return np.unpackbits(np.frombuffer(bits.to_bytes((cell_num + 7) // 8, "little"), dtype=np.uint8),
+                         count=cell_num, bitorder="little")
+
+
+@lru_cache(maxsize=None)
+def get_line_masks(row: int, col: int, length: int) -> Tuple[int, ...]:
+    """
+    :return: bit mask of every window of get_line_windows(row, col, length), bit i is cell i of board.ravel()
+    """
+    return tuple(sum(1 << cell for cell in cells) for cells in get_line_windows(row, col, length).tolist())
+
+
+@lru_cache(maxsize=None)
+def get_cell_line_masks(row: int, col: int, length: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    :return: masks of the windows which contain each cell
+    """
+    masks = get_line_masks(row, col, length)
+    return tuple(tuple(masks[i] for i in ids) for ids in get_cell_windows(row, col, length))
+
+
+@lru_cache(maxsize=None)
+def get_live_line_masks(row: int, col: int, goal_chess_num: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    :return: for every window with goal_chess_num + 1 cells: (mask of two ends, mask of inner cells, first cell,
+    last cell, second inner cell, third inner cell)
+    """
+    return tuple(
+        ((1 << cells[0]) | (1 << cells[-1]), sum(1 << x for x in cells[1:-1]), cells[0], cells[-1], cells[2], cells[3])
+        for cells in get_line_windows(row, col, goal_chess_num + 1).tolist()
+    )
+
+
+class BitChessBoard(ChessBoard):
+    """
+    ChessBoard whose stones are stored as one python int bitboard per player (bit r * col + c), the rule searches are
+    done with precomputed window masks and popcount. `board` is still available as a ndarray, it is only synchronized
+    when someone reads it, moves and the history planes of the transformer do not read it.
+    """
+    def __init__(self, row: int, col: int, goal_chess_num: int = 5, random_alpha=10):
+        self.bits = {GAME_PLAYER.PLAYER_ONE: 0, GAME_PLAYER.PLAYER_TWO: 0}
+        self._board = None
+        # board和bitboard不同步时为True，读取board时重新建立
+        self._dirty = False
+        # masks of windows with goal_chess_num cells and goal_chess_num + 1 cells
+        self.goal_masks = get_line_masks(row, col, goal_chess_num)
+        self.cell_goal_masks = get_cell_line_masks(row, col, goal_chess_num)
+        self.live_masks = get_live_line_masks(row, col, goal_chess_num)
+        super(BitChessBoard, self).__init__(row, col, goal_chess_num, random_alpha)
+
+    @property
+    def board(self):
+        if self._dirty:
+            self._board[...] = self.get_bit_board()
+            self._dirty = False
+        return self._board
+
+    @board.setter
+    def board(self, value):
+        self._board = value
+
+    def reset(self):
+        self.bits[GAME_PLAYER.PLAYER_ONE] = 0
+        self.bits[GAME_PLAYER.PLAYER_TWO] = 0
+        self._dirty = False
+        super(BitChessBoard, self).reset()
+
+    def place_chess(self, r, c, player):
+        self.bits[player] |= 1 << (r * self.col + c)
+        self._dirty = True
+
+    def remove_chess(self, r, c):
+        cell = ~(1 << (r * self.col + c))
+        self.bits[GAME_PLAYER.PLAYER_ONE] &= cell
+        self.bits[GAME_PLAYER.PLAYER_TWO] &= cell
+        self._dirty = True
+
+    def get_bit_board(self) -> np.ndarray:
+        """
+        :return: [row, col] int8 board built from the bitboards, 1 / -1 for the stones of player one / two
+        """
+        cell_num = self.row * self.col
+        board = get_bit_array(self.bits[GAME_PLAYER.PLAYER_ONE], cell_num).astype(np.int8)
+        board -= get_bit_array(self.bits[GAME_PLAYER.PLAYER_TWO], cell_num).view(np.int8)
+        return board.reshape(self.row, self.col)
+
+    def update_next_window_step(self):
+        # 和ChessBoard相同，但是从bitboard得到棋盘，不同步board
+        slot = (len(self.steps) + 1) % self.history_size
+        np.multiply(self.get_bit_board(), int(self.current_player), out=self.history_planes[slot], casting='unsafe')
+        oppo_plane = self.history_planes[self.history_size + slot]
+        oppo_plane.fill(0.)
+        if self.last_move is not None:
+            oppo_plane[self.last_move] = -1
+
+    def is_last_move_winner(self, r, c) -> int:
+        player_bits = self.bits[self.get_chess_value(r, c)]
+        for mask in self.cell_goal_masks[r * self.col + c]:
+            if player_bits & mask == mask:
+                return 1
+        if len(self.steps) >= self.row * self.col:
+            return 2
+        return 0
+
+    def is_player_winner(self, player, board, goal_num) -> Tuple[int, List]:
+        if board is not self._board:
+            return super(BitChessBoard, self).is_player_winner(player, board, goal_num)
+        me = self.bits[player]
+        used = me | self.bits[-player]
+        status = 0
+        win_steps = []
+        for mask in self.goal_masks:
+            if popcount(me & mask) >= goal_num:
+                status = 1
+                if goal_num != self.goal_chess_num and mask & ~me:
+                    # 窗口中第一个不属于player的位置
+                    cell = lowest_bit_index(mask & ~me)
+                    if not (used >> cell) & 1:
+                        win_steps.append(divmod(cell, self.col))
+        if status <= 0 and popcount(used) == self.row * self.col:
+            status = 2
+        return status, win_steps
+
+    def search_player_livefour_step(self, board, player, oppo, current=True) -> List[Tuple[int, int]]:
+        if board is not self._board:
+            return super(BitChessBoard, self).search_player_livefour_step(board, player, oppo, current)
+        me, op = self.bits[player], self.bits[oppo]
+        used = me | op
+        goal_num = self.goal_chess_num - 2
+        four_in_line_steps = set()
+        for end_mask, inner_mask, start, end, second, third in self.live_masks:
+            if op & end_mask or popcount(me & inner_mask) < goal_num or not inner_mask & ~me:
+                continue
+            cell = lowest_bit_index(inner_mask & ~me)
+            codes = [cell]
+            if not current and (cell == second or cell == third) and not (op >> cell) & 1:
+                codes.append(start)
+                codes.append(end)
+            for code in codes:
+                if not (used >> code) & 1:
+                    four_in_line_steps.add(divmod(code, self.col))
+        return list(four_in_line_steps)
+
+    def search_player_one_side_four_step(self, board, player, oppo) -> List[Tuple[int, int]]:
+        if board is not self._board:
+            return super(BitChessBoard, self).search_player_one_side_four_step(board, player, oppo)
+        me, op = self.bits[player], self.bits[-player]
+        empty = ~(me | op)
+        goal_num = self.goal_chess_num - 2
+        four_in_line_steps = set()
+        for mask in self.goal_masks:
+            if popcount(me & mask) - popcount(op & mask) >= goal_num:
+                for cell in iter_bit_index(mask & empty):
+                    four_in_line_steps.add(divmod(cell, self.col))
+        return list(four_in_line_steps)
+
+    @property
+    def shape(self):
+        return self.row, self.col
+
+    def get_chess_value(self, r, c):
+        cell = r * self.col + c
+        if (self.bits[GAME_PLAYER.PLAYER_ONE] >> cell) & 1:
+            return GAME_PLAYER.PLAYER_ONE
+        if (self.bits[GAME_PLAYER.PLAYER_TWO] >> cell) & 1:
+            return GAME_PLAYER.PLAYER_TWO
+        return GAME_PLAYER.EMPTY
+
+    def is_empty(self, r, c):
+        cell = r * self.col + c
+        return not ((self.bits[GAME_PLAYER.PLAYER_ONE] | self.bits[GAME_PLAYER.PLAYER_TWO]) >> cell) & 1
@@ -11,12 +11,13 @@ class Game(object):
                  chess_size,
                  goal_chess_num=5,
                  collect_train_data=True,
-                 first_random_alpha=10
+                 first_random_alpha=10,
+                 board_class=ChessBoard
                  ):
         self.player_method = dict()
         self.current_player = None
         self.is_play = False
-        self.chessboard = ChessBoard(chess_size, chess_size, goal_chess_num, random_alpha=first_random_alpha)
+        self.chessboard = board_class(chess_size, chess_size, goal_chess_num, random_alpha=first_random_alpha)
         self.action = None
         self.winner = None
         self.epoch = -1
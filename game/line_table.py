@@ -0,0 +1,42 @@
+import numpy as np
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_line_windows(row: int, col: int, length: int) -> np.ndarray:
+    """
+    all windows of `length` continuous cells on the board (vertical, horizontal and both diagonals), in the same
+    order as the loops of ChessBoard.is_player_winner / search_player_livefour_step visit them
+    :return: [window_num, length], each value is the index of the cell in board.ravel()
+    """
+    windows = []
+    delta = np.arange(length)
+    # 1. 纵向
+    for x in range(row - length + 1):
+        for y in range(col):
+            windows.append((x + delta) * col + y)
+    # 2. 横向
+    for x in range(row):
+        for y in range(col - length + 1):
+            windows.append(x * col + y + delta)
+    # 3. 斜向: 左上-右下 与 右上-左下 交替
+    for x in range(row - length + 1):
+        for y in range(col - length + 1):
+            windows.append((x + delta) * col + y + delta)
+            windows.append((x + delta) * col + y + length - 1 - delta)
+    windows = np.array(windows, dtype=np.int64).reshape(-1, length)
+    windows.flags.writeable = False
+    return windows
+
+
+@lru_cache(maxsize=None)
+def get_cell_windows(row: int, col: int, length: int):
+    """
+    :return: tuple with row * col items, item i is the ids of windows (see get_line_windows) which contain cell i
+    """
+    windows = get_line_windows(row, col, length)
+    cell_windows = [[] for _ in range(row * col)]
+    for window_id, cells in enumerate(windows.tolist()):
+        for cell in cells:
+            cell_windows[cell].append(window_id)
+    return tuple(tuple(ids) for ids in cell_windows)
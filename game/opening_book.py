@@ -0,0 +1,84 @@
+from game.base_board import ChessBoard
+from game.zobrist import get_symmetry_maps, get_inverse_symmetry_maps
+from loguru import logger
+from typing import Dict, Optional, Tuple
+import numpy as np
+import os
+
+# 每个局面10字节: ChessBoard.canonical_hash，以及取得canonical hash的对称变换后的棋盘上的走法r * col + c
+BOOK_DTYPE = np.dtype([("key", "<u8"), ("move", "<u2")])
+
+
+class OpeningBook(object):
+    """
+    Opening moves keyed by ChessBoard.canonical_hash, so one entry serves all rotations and flips of a position.
+    The book file is a .npy array of BOOK_DTYPE sorted by key, it is memory-mapped and searched by binary search.
+    The side to move is not in the key, it is given by the number of stones.
+    """
+    def __init__(self, row: int, col: int, book_file: Optional[str] = None):
+        """
+        :param book_file: .npy file written by OpeningBook.save, an empty book if it is None or does not exist
+        """
+        self.row = row
+        self.col = col
+        self.book_file = book_file
+        self.maps = get_symmetry_maps(row, col)
+        self.inverse_maps = get_inverse_symmetry_maps(row, col)
+        self.entries = np.zeros(0, dtype=BOOK_DTYPE)
+        if book_file is not None:
+            if os.path.exists(book_file):
+                self.entries = np.load(book_file, mmap_mode="r")
+                logger.info(f"Load opening book from {book_file}, {len(self.entries)} positions!")
+            else:
+                logger.warning(f"Opening book {book_file} does not exist!")
+        self.keys = self.entries["key"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getstate__(self):
+        # 复制到其它进程时重新映射文件
+        state = self.__dict__.copy()
+        del state["entries"], state["keys"]
+        return state
+
+    def __setstate__(self, state):
+        # 每个epoch都会复制到训练进程，不再打印日志
+        self.__dict__.update(state)
+        self.entries = np.zeros(0, dtype=BOOK_DTYPE)
+        if self.book_file is not None and os.path.exists(self.book_file):
+            self.entries = np.load(self.book_file, mmap_mode="r")
+        self.keys = self.entries["key"]
+
+    def probe(self, chessboard: ChessBoard) -> Optional[Tuple[int, int]]:
+        """
+        :return: (r, c) book move of the current player, None if the position is not in the book
+        """
+        if len(self.keys) == 0 or chessboard.game_end:
+            return None
+        key, symmetry = chessboard.get_canonical_symmetry()
+        index = np.searchsorted(self.keys, np.uint64(key))
+        if index == len(self.keys) or int(self.keys[index]) != key:
+            return None
+        r, c = divmod(self.inverse_maps[symmetry][int(self.entries[index]["move"])], self.col)
+        if not chessboard.is_empty(r, c):
+            # hash冲突
+            return None
+        return r, c
+
+    def get_entry(self, chessboard: ChessBoard, r: int, c: int) -> Tuple[int, int]:
+        """
+        :return: key, move of the book entry for playing (r, c) in the position of chessboard
+        """
+        key, symmetry = chessboard.get_canonical_symmetry()
+        return key, self.maps[symmetry][r * self.col + c]
+
+    @staticmethod
+    def save(book_file: str, moves: Dict[int, int]):
+        """
+        :param moves: {key: move} entries from get_entry
+        """
+        entries = np.array(sorted(moves.items()), dtype=BOOK_DTYPE)
+        if os.path.dirname(book_file) and not os.path.exists(os.path.dirname(book_file)):
+            os.makedirs(os.path.dirname(book_file))
+        np.save(book_file, entries)
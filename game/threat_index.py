@@ -0,0 +1,157 @@
+from game.cons import GAME_PLAYER
+from game.line_table import get_line_windows, get_cell_windows
+from typing import Set
+
+
+class ThreatIndex(object):
+    """
+    Threat points of both players on a chess board. Every window keeps the points it contributes, when a cell
+    changes only the windows through that cell are recomputed, a point is in the index while at least one window
+    contributes it. The points are the same as the ones found by the full board scans of ChessBoard:
+    WIN:              is_player_winner(player, board, goal_chess_num - 1)
+    LIVE_FOUR:        search_player_livefour_step(board, player, oppo, current=True)
+    LIVE_FOUR_DEFEND: search_player_livefour_step(board, player, oppo, current=False)
+    ONE_SIDE_FOUR:    search_player_one_side_four_step(board, player, oppo)
+    """
+    WIN, LIVE_FOUR, LIVE_FOUR_DEFEND, ONE_SIDE_FOUR = range(4)
+    PLAYERS = (GAME_PLAYER.PLAYER_ONE, GAME_PLAYER.PLAYER_TWO)
+
+    def __init__(self, row: int, col: int, goal_chess_num: int = 5):
+        self.row = row
+        self.col = col
+        self.goal_chess_num = goal_chess_num
+        self.goal_windows = get_line_windows(row, col, goal_chess_num).tolist()
+        self.live_windows = get_line_windows(row, col, goal_chess_num + 1).tolist()
+        self.cell_goal_windows = get_cell_windows(row, col, goal_chess_num)
+        self.cell_live_windows = get_cell_windows(row, col, goal_chess_num + 1)
+
+        self.flat = None
+        # [player][window] -> (WIN points, ONE_SIDE_FOUR points) / (LIVE_FOUR points, LIVE_FOUR_DEFEND points)
+        self.goal_points = None
+        self.live_points = None
+        # [player][kind][cell] -> number of windows which contribute the cell
+        self.count = None
+        self.points = None
+        # 窗口中的值 -> 每个玩家的点在窗口中的位置，只和窗口中的值有关
+        self.goal_patterns = {}
+        self.live_patterns = {}
+        self.reset()
+
+    def reset(self):
+        cell_num = self.row * self.col
+        self.flat = [GAME_PLAYER.EMPTY] * cell_num
+        self.goal_points = {p: [((), ())] * len(self.goal_windows) for p in self.PLAYERS}
+        self.live_points = {p: [((), ())] * len(self.live_windows) for p in self.PLAYERS}
+        self.count = {p: [[0] * cell_num for _ in range(4)] for p in self.PLAYERS}
+        self.points = {p: [set() for _ in range(4)] for p in self.PLAYERS}
+        if self.goal_chess_num < 3:
+            # 棋盘为空时窗口也可能有威胁点
+            for window_id in range(len(self.goal_windows)):
+                self._update_goal_window(window_id)
+            for window_id in range(len(self.live_windows)):
+                self._update_live_window(window_id)
+
+    def update(self, cell: int, value):
+        """
+        :param cell: r * col + c
+        :param value: new value of the cell
+        """
+        self.flat[cell] = value
+        for window_id in self.cell_goal_windows[cell]:
+            self._update_goal_window(window_id)
+        for window_id in self.cell_live_windows[cell]:
+            self._update_live_window(window_id)
+
+    def get_points(self, kind: int, player) -> Set[int]:
+        return self.points[player][kind]
+
+    def _change(self, player, kind, old, new):
+        count = self.count[player][kind]
+        points = self.points[player][kind]
+        for cell in old:
+            count[cell] -= 1
+            if count[cell] == 0:
+                points.discard(cell)
+        for cell in new:
+            if count[cell] == 0:
+                points.add(cell)
+            count[cell] += 1
+
+    def _update_goal_window(self, window_id):
+        cells = self.goal_windows[window_id]
+        flat = self.flat
+        values = tuple([flat[cell] for cell in cells])
+        patterns = self.goal_patterns.get(values)
+        if patterns is None:
+            patterns = self.goal_patterns[values] = self._goal_pattern(values)
+        for player, (win, four) in zip(self.PLAYERS, patterns):
+            if win:
+                win = (cells[win[0]],)
+            if four:
+                four = tuple([cells[i] for i in four])
+            old_win, old_four = self.goal_points[player][window_id]
+            if old_win != win:
+                self._change(player, self.WIN, old_win, win)
+            if old_four != four:
+                self._change(player, self.ONE_SIDE_FOUR, old_four, four)
+            self.goal_points[player][window_id] = (win, four)
+
+    def _update_live_window(self, window_id):
+        cells = self.live_windows[window_id]
+        flat = self.flat
+        values = tuple([flat[cell] for cell in cells])
+        patterns = self.live_patterns.get(values)
+        if patterns is None:
+            patterns = self.live_patterns[values] = self._live_pattern(values)
+        for player, (live, defend) in zip(self.PLAYERS, patterns):
+            if live:
+                live = (cells[live[0]],)
+            if defend:
+                defend = tuple([cells[i] for i in defend])
+            old_live, old_defend = self.live_points[player][window_id]
+            if old_live != live:
+                self._change(player, self.LIVE_FOUR, old_live, live)
+            if old_defend != defend:
+                self._change(player, self.LIVE_FOUR_DEFEND, old_defend, defend)
+            self.live_points[player][window_id] = (live, defend)
+
+    def _goal_pattern(self, values):
+        # 每个玩家窗口中(WIN, ONE_SIDE_FOUR)点在窗口中的位置
+        patterns = []
+        for player in self.PLAYERS:
+            player_num = values.count(player)
+            win = ()
+            if player_num >= self.goal_chess_num - 1 and player_num < len(values):
+                # 窗口中第一个不属于player的位置
+                for i, value in enumerate(values):
+                    if value != player:
+                        if value == GAME_PLAYER.EMPTY:
+                            win = (i,)
+                        break
+            four = ()
+            if player_num - values.count(-player) >= self.goal_chess_num - 2:
+                four = tuple(i for i, value in enumerate(values) if value == GAME_PLAYER.EMPTY)
+            patterns.append((win, four))
+        return tuple(patterns)
+
+    def _live_pattern(self, values):
+        # 每个玩家窗口中(LIVE_FOUR, LIVE_FOUR_DEFEND)点在窗口中的位置
+        patterns = []
+        for player in self.PLAYERS:
+            oppo = -player
+            live, defend = (), ()
+            if values[0] != oppo and values[-1] != oppo:
+                inner = values[1:-1]
+                if self.goal_chess_num - 2 <= inner.count(player) < len(inner):
+                    gap = 1
+                    while values[gap] == player:
+                        gap += 1
+                    codes = [gap]
+                    if (gap == 2 or gap == 3) and values[gap] != oppo:
+                        codes.append(0)
+                        codes.append(len(values) - 1)
+                    defend = tuple(code for code in codes if values[code] == GAME_PLAYER.EMPTY)
+                    if values[gap] == GAME_PLAYER.EMPTY:
+                        live = (gap,)
+            patterns.append((live, defend))
+        return tuple(patterns)
@@ -0,0 +1,183 @@
+from game.cons import GAME_PLAYER
+from game.threat_index import ThreatIndex
+from game.line_table import get_line_windows
+from game.zobrist import get_zobrist_keys
+from typing import Optional, Tuple
+import numpy as np
+import threading
+
+
+class ThreatSpaceSearch(object):
+    """
+    Threat space search of a winning forcing sequence for the player to move. Only forcing moves are expanded:
+    VCF (victory by continuous fours): every attacker move makes a four, the defender can only block it.
+    VCT (victory by continuous threats): the attacker also plays threes (moves which give a live four point), the
+    defender counters with a four or plays any move after which the attacker has no live four point.
+    The threat points come from an incremental ThreatIndex, so the rules are the same as ChessBoard's rule searches.
+    solve can be called from many threads, the calls run one at a time.
+    """
+    def __init__(self, row: int, col: int, goal_chess_num: int = 5, vcf_depth: int = 12, vct_depth: int = 6,
+                 max_nodes: int = 5000):
+        """
+        :param vcf_depth: max attacker moves of a VCF sequence
+        :param vct_depth: max attacker moves of a VCT sequence
+        :param max_nodes: max attacker and defender moves searched in one solve
+        """
+        self.row = row
+        self.col = col
+        self.goal_chess_num = goal_chess_num
+        self.vcf_depth = vcf_depth
+        self.vct_depth = vct_depth
+        self.max_nodes = max_nodes
+        self.index = ThreatIndex(row, col, goal_chess_num)
+        self.zobrist_keys = get_zobrist_keys(row, col)
+        # 可能形成活三的窗口: 长度为goal_chess_num + 1，两端不是对手的棋，中间有goal_chess_num - 3个自己的棋
+        self.live_windows = get_line_windows(row, col, goal_chess_num + 1).tolist()
+        self.hash = 0
+        self.nodes = 0
+        self.cache = {}
+        # solve修改index等共用的状态
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def solve(self, board: np.ndarray, player, vct: bool = True) -> Optional[Tuple[int, int]]:
+        """
+        :param board: [row, col] board of GAME_PLAYER values
+        :param player: the player to move
+        :param vct: search VCT after VCF fails
+        :return: (r, c) first move of a winning forcing sequence, None if it is not found within the limits
+        """
+        with self.lock:
+            return self._solve(board, player, vct)
+
+    def _solve(self, board: np.ndarray, player, vct: bool) -> Optional[Tuple[int, int]]:
+        self.index.reset()
+        self.hash = 0
+        for cell, value in enumerate(board.ravel().tolist()):
+            if value != GAME_PLAYER.EMPTY:
+                self.index.update(cell, value)
+                self.hash ^= self.zobrist_keys[value][cell]
+        self.nodes = 0
+        self.cache = {}
+        cell = self._attack(player, self.vcf_depth, False)
+        if vct:
+            # VCT的分支多，从浅到深搜索，先找到最短的
+            depth = 1
+            while cell is None and depth <= self.vct_depth and self.nodes < self.max_nodes:
+                cell = self._attack(player, depth, True)
+                depth += 1
+        if cell is None:
+            return None
+        return divmod(cell, self.col)
+
+    def _place(self, cell, player):
+        self.index.update(cell, player)
+        self.hash ^= self.zobrist_keys[player][cell]
+        self.nodes += 1
+
+    def _remove(self, cell, player):
+        self.index.update(cell, GAME_PLAYER.EMPTY)
+        self.hash ^= self.zobrist_keys[player][cell]
+
+    def _three_moves(self, player):
+        # 下在这些位置之后可能形成活三
+        flat = self.index.flat
+        moves = set()
+        need = self.goal_chess_num - 3
+        for cells in self.live_windows:
+            if flat[cells[0]] == -player or flat[cells[-1]] == -player:
+                continue
+            inner = [flat[cell] for cell in cells[1:-1]]
+            if -player in inner or inner.count(player) != need:
+                continue
+            moves.update(cell for cell, value in zip(cells[1:-1], inner) if value == GAME_PLAYER.EMPTY)
+        return moves
+
+    def _defend_moves(self, player):
+        # -player下在这些位置之后player没有LIVE_FOUR点，LIVE_FOUR_DEFEND点之外还有堵住另一端等防守方法。
+        # 窗口中有对手的棋就不再提供LIVE_FOUR点，所以这些位置是所有提供LIVE_FOUR点的窗口的交集中的空点
+        index = self.index
+        cells = None
+        for point in index.get_points(ThreatIndex.LIVE_FOUR, player):
+            for window_id in index.cell_live_windows[point]:
+                if index.live_points[player][window_id][0] == (point,):
+                    window = set(index.live_windows[window_id])
+                    cells = window if cells is None else cells & window
+        if not cells:
+            return set()
+        return {cell for cell in cells if index.flat[cell] == GAME_PLAYER.EMPTY}
+
+    def _attack(self, player, depth, vct) -> Optional[int]:
+        """
+        player to move
+        :return: winning move, None if not found
+        """
+        index = self.index
+        win_points = index.get_points(ThreatIndex.WIN, player)
+        if win_points:
+            return min(win_points)
+        if depth <= 0 or self.nodes >= self.max_nodes:
+            return None
+        key = (self.hash, player, depth, vct)
+        if key in self.cache:
+            return self.cache[key]
+        oppo_win_points = index.get_points(ThreatIndex.WIN, -player)
+        if len(oppo_win_points) > 1:
+            return None
+        # 先试冲四，再试活三
+        moves = sorted(index.get_points(ThreatIndex.ONE_SIDE_FOUR, player))
+        if vct:
+            moves += sorted(self._three_moves(player).difference(moves))
+        if oppo_win_points:
+            # 对手有冲四时只能防守
+            moves = [cell for cell in moves if cell in oppo_win_points]
+        result = None
+        for cell in moves:
+            self._place(cell, player)
+            if index.get_points(ThreatIndex.WIN, player) or \
+                    (vct and index.get_points(ThreatIndex.LIVE_FOUR, player)):
+                win = self._defend(player, depth - 1, vct)
+            else:
+                win = False
+            self._remove(cell, player)
+            if win:
+                result = cell
+                break
+        if self.nodes < self.max_nodes:
+            # 超出节点数限制时的结果不可靠，不缓存
+            self.cache[key] = result
+        return result
+
+    def _defend(self, player, depth, vct) -> bool:
+        """
+        -player to move after a threat of player
+        :return: player wins whatever -player does
+        """
+        index = self.index
+        oppo = -player
+        if index.get_points(ThreatIndex.WIN, oppo):
+            return False
+        win_points = index.get_points(ThreatIndex.WIN, player)
+        if len(win_points) > 1:
+            return True
+        if win_points:
+            replies = list(win_points)
+        else:
+            # 先试反冲四，再试所有防住活三的点
+            replies = sorted(index.get_points(ThreatIndex.ONE_SIDE_FOUR, oppo))
+            replies += sorted(self._defend_moves(player).difference(replies))
+        for cell in replies:
+            self._place(cell, oppo)
+            win = self._attack(player, depth, vct) is not None
+            self._remove(cell, oppo)
+            if not win:
+                return False
+        return True
@@ -0,0 +1,69 @@
+from game.cons import GAME_PLAYER
+from functools import lru_cache
+from typing import Dict, Tuple
+import random
+
+ZOBRIST_SEED = 20220401
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_keys(row: int, col: int) -> Dict[GAME_PLAYER, Tuple[int, ...]]:
+    """
+    random 64 bit key of each player for each cell (r * col + c), the keys are the same in every process
+    """
+    rand = random.Random(f"{ZOBRIST_SEED}-{row}-{col}")
+    return {player: tuple(rand.getrandbits(64) for _ in range(row * col))
+            for player in (GAME_PLAYER.PLAYER_ONE, GAME_PLAYER.PLAYER_TWO)}
+
+
+@lru_cache(maxsize=None)
+def get_symmetry_maps(row: int, col: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    cell permutations of the board symmetries, the first one is identity.
+    8 symmetries (rotations and flips) for square board, 4 (flips and 180 rotation) otherwise.
+    maps[s][cell] is the position of cell after symmetry s
+    """
+    transforms = [
+        lambda r, c: (r, c),
+        lambda r, c: (row - 1 - r, col - 1 - c),
+        lambda r, c: (r, col - 1 - c),
+        lambda r, c: (row - 1 - r, c),
+    ]
+    if row == col:
+        transforms += [
+            lambda r, c: (c, row - 1 - r),
+            lambda r, c: (col - 1 - c, r),
+            lambda r, c: (c, r),
+            lambda r, c: (col - 1 - c, row - 1 - r),
+        ]
+    maps = []
+    for transform in transforms:
+        cells = []
+        for r in range(row):
+            for c in range(col):
+                tr, tc = transform(r, c)
+                cells.append(tr * col + tc)
+        maps.append(tuple(cells))
+    return tuple(maps)
+
+
+@lru_cache(maxsize=None)
+def get_inverse_symmetry_maps(row: int, col: int) -> Tuple[Tuple[int, ...], ...]:
+    inverse_maps = []
+    for cells in get_symmetry_maps(row, col):
+        inverse = [0] * len(cells)
+        for cell, target in enumerate(cells):
+            inverse[target] = cell
+        inverse_maps.append(tuple(inverse))
+    return tuple(inverse_maps)
+
+
+@lru_cache(maxsize=None)
+def get_symmetry_zobrist_keys(row: int, col: int) -> Dict[GAME_PLAYER, Tuple[Tuple[int, ...], ...]]:
+    """
+    keys[player][cell][s]: key of the chess after symmetry s, xor them to update the hashes of all symmetries
+    """
+    keys = get_zobrist_keys(row, col)
+    maps = get_symmetry_maps(row, col)
+    return {player: tuple(tuple(keys[player][cells[cell]] for cells in maps) for cell in range(row * col))
+            for player in keys}
@@ -0,0 +1,42 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tool.benchmark_search import get_positions
+from user.beta.agent import ChessAI, to_search_board
+from loguru import logger
+import time
+
+CHESSBOARD_SIZE = 15
+SEARCH_DEPTH = 4
+REPEAT = 20
+
+
+def time_genmove(ai: ChessAI, positions):
+    # 每个局面双方各生成一次走法，search_board为None，不使用得分缓存
+    results = []
+    start_time = time.time()
+    for i in range(REPEAT):
+        results = [ai.genmove(board, turn) for board, turn in positions]
+    return (time.time() - start_time) / REPEAT, results
+
+
+def time_search(ai: ChessAI, positions):
+    start_time = time.time()
+    results = [ai.search(board, turn, SEARCH_DEPTH) for board, turn in positions]
+    return time.time() - start_time, results
+
+
+def main():
+    positions = [to_search_board(chessboard) for chessboard in get_positions()]
+    logger.info(f"{len(positions)} positions, genmove repeat {REPEAT}, search depth {SEARCH_DEPTH}.")
+    scalar_ai = ChessAI(CHESSBOARD_SIZE, batch_score=False)
+    batch_ai = ChessAI(CHESSBOARD_SIZE, batch_score=True)
+    for name, timer in (("genmove", time_genmove), ("search", time_search)):
+        scalar_time, scalar_results = timer(scalar_ai, positions)
+        batch_time, batch_results = timer(batch_ai, positions)
+        logger.info(f"{name}: scalar {round(scalar_time, 3)}s, batch {round(batch_time, 3)}s, "
+                    f"speedup: {round(scalar_time / batch_time, 2)}, same result: {scalar_results == batch_results}.")
+
+
+if __name__ == '__main__':
+    main()
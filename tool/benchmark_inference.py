@@ -0,0 +1,44 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.game import Game
+from user.transformer.agent import Transformer_Gobang
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+import time
+
+MODEL_FILE = "data/model_teacher_train.pkl"
+CHESSBOARD_SIZE = 15
+GAME_NUM = 64
+MAX_BATCH_SIZE = 64
+MAX_WAIT = 0.002
+
+
+def play(agent: Transformer_Gobang):
+    # transformer自己对弈一局，返回步数
+    game = Game(CHESSBOARD_SIZE, collect_train_data=False)
+    game.set_player(agent.predict_step, agent.predict_step)
+    game.play(0)
+    return len(game.chessboard.steps)
+
+
+def main():
+    agent = Transformer_Gobang(CHESSBOARD_SIZE, CHESSBOARD_SIZE, train=False, model_file=MODEL_FILE)
+    start_time = time.time()
+    step_num = sum(play(agent) for _ in range(GAME_NUM))
+    spend_time = time.time() - start_time
+    logger.info(f"sequential: {GAME_NUM} games, {step_num} moves, {round(step_num / spend_time, 1)} moves/s.")
+
+    agent.start_batcher(MAX_BATCH_SIZE, MAX_WAIT)
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=GAME_NUM) as executor:
+        step_num = sum(executor.map(play, [agent] * GAME_NUM))
+    spend_time = time.time() - start_time
+    batcher = agent.batcher
+    logger.info(f"batched: {GAME_NUM} games, {step_num} moves, {round(step_num / spend_time, 1)} moves/s, "
+                f"mean batch size: {round(batcher.position_num / max(batcher.batch_num, 1), 1)}.")
+    agent.stop_batcher()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tool.benchmark_search import get_positions
+from user.beta.agent import ChessAI, MAP_ENTRY_TYPE, to_search_board
+from user.beta.jit import NUMBA_AVAILABLE
+from loguru import logger
+import numpy as np
+import random
+import time
+
+CHESSBOARD_SIZE = 15
+SEARCH_DEPTHS = [2, 3, 4, 5]
+RANDOM_POSITION_NUM = 100
+SEED = 2022
+
+
+def get_random_positions(position_num=RANDOM_POSITION_NUM, seed=SEED):
+    # 随机撒子的局面，双方棋子数相同或黑棋多一个
+    rand = random.Random(seed)
+    positions = []
+    for i in range(position_num):
+        board = np.zeros((CHESSBOARD_SIZE, CHESSBOARD_SIZE), dtype=int)
+        stone_num = rand.randint(1, 30)
+        cells = rand.sample(range(CHESSBOARD_SIZE * CHESSBOARD_SIZE), stone_num)
+        for j, cell in enumerate(cells):
+            board.flat[cell] = MAP_ENTRY_TYPE.MAP_PLAYER_ONE if j % 2 == 0 else MAP_ENTRY_TYPE.MAP_PLAYER_TWO
+        turn = MAP_ENTRY_TYPE.MAP_PLAYER_TWO if stone_num % 2 else MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+        positions.append((board, turn))
+    return positions
+
+
+def main():
+    # 编译的搜索和python的搜索在相同局面上的结果必须相同
+    if not NUMBA_AVAILABLE:
+        logger.error("numba is not installed.")
+        return
+    python_ai = ChessAI(CHESSBOARD_SIZE)
+    jit_ai = ChessAI(CHESSBOARD_SIZE, jit=True)
+    # 预热: 编译
+    jit_ai.search(*get_random_positions(1)[0], depth=2)
+    game_positions = [to_search_board(chessboard) for chessboard in get_positions()]
+    for name, positions in (("game", game_positions), ("random", get_random_positions())):
+        for depth in SEARCH_DEPTHS:
+            if name == "random" and depth > 3:
+                continue
+            times, results = [], []
+            for ai in (python_ai, jit_ai):
+                start_time = time.time()
+                results.append([ai.search(board, turn, depth) for board, turn in positions])
+                times.append(time.time() - start_time)
+            mismatches = sum(a != b for a, b in zip(*results))
+            logger.info(f"{len(positions)} {name} positions, depth {depth}: python {round(times[0], 2)}s, "
+                        f"jit {round(times[1], 2)}s, speedup: {round(times[0] / times[1], 2)}, "
+                        f"mismatches: {mismatches}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.base_board import ChessBoard
+from user.beta.agent import ChessAI, to_search_board
+from loguru import logger
+import random
+import time
+
+CHESSBOARD_SIZE = 15
+SEARCH_DEPTH = 5
+WORKERS = [1, 2, 4, 8, 16]
+POSITION_NUM = 12
+SEED = 2022
+
+
+def get_positions(position_num=POSITION_NUM, seed=SEED):
+    # 固定的测试局面: 随机开局后ChessAI(深度2)自己对弈到第8到20步
+    rand = random.Random(seed)
+    ai = ChessAI(CHESSBOARD_SIZE, search_depth=2)
+    positions = []
+    while len(positions) < position_num:
+        chessboard = ChessBoard(CHESSBOARD_SIZE, CHESSBOARD_SIZE)
+        chessboard.move(rand.randint(5, 9), rand.randint(5, 9))
+        stop = rand.randint(8, 20)
+        status = 0
+        while status == 0 and len(chessboard.steps) < stop:
+            status, _ = chessboard.move(*ai.predict_step(chessboard))
+        if status == 0:
+            positions.append(chessboard)
+    return positions
+
+
+def main():
+    positions = [to_search_board(chessboard) for chessboard in get_positions()]
+    logger.info(f"{len(positions)} positions, search depth {SEARCH_DEPTH}, {os.cpu_count()} cpus.")
+    base_time, base_results = None, None
+    for workers in WORKERS:
+        ai = ChessAI(CHESSBOARD_SIZE, workers=workers)
+        # 预热: 创建进程池
+        ai.search(*positions[0], depth=2)
+        results = []
+        start_time = time.time()
+        for board, turn in positions:
+            results.append(ai.search(board, turn, SEARCH_DEPTH))
+        spend_time = time.time() - start_time
+        ai.close()
+        if base_time is None:
+            base_time, base_results = spend_time, results
+        logger.info(f"workers: {workers}, spend time: {round(spend_time, 2)}s, "
+                    f"speedup: {round(base_time / spend_time, 2)}, same result: {results == base_results}.")
+
+
+if __name__ == '__main__':
+    main()
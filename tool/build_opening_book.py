@@ -0,0 +1,56 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.base_board import ChessBoard
+from game.opening_book import OpeningBook
+from user.beta.agent import ChessAI, to_search_board
+from loguru import logger
+import time
+
+BOOK_FILE = "data/opening_book.npy"
+CHESSBOARD_SIZE = 15
+BOOK_DEPTH = 6  # 开局库的搜索深度，比对弈时深
+BOOK_PLIES = 6  # 棋子数少于BOOK_PLIES的局面写入开局库
+FIRST_MOVE_RANGE = range(4, 11)  # get_random_first_step的第一步基本都在这个范围内
+REPLY_NUM = 3  # 每个局面展开的走法数: 开局库的走法和ChessAI评分最高的其它走法
+
+
+def expand(chessboard: ChessBoard, teacher: ChessAI, book: OpeningBook, moves: dict):
+    # 深度优先展开局面，对称的局面只搜索一次
+    if len(chessboard.steps) >= BOOK_PLIES:
+        return
+    key = chessboard.canonical_hash
+    if key in moves:
+        return
+    r, c = teacher.predict_step(chessboard, first_random=False)
+    moves[key] = book.get_entry(chessboard, r, c)[1]
+    board, turn = to_search_board(chessboard)
+    steps = [(r, c)] + [(y, x) for _, x, y in teacher.genmove(board, turn) if (y, x) != (r, c)]
+    for step in steps[:REPLY_NUM]:
+        status, _ = chessboard.push(*step)
+        if status == -1:
+            continue
+        if status == 0:
+            expand(chessboard, teacher, book, moves)
+        chessboard.pop()
+
+
+def main():
+    teacher = ChessAI(CHESSBOARD_SIZE, search_depth=BOOK_DEPTH, jit=True)
+    book = OpeningBook(CHESSBOARD_SIZE, CHESSBOARD_SIZE)
+    chessboard = ChessBoard(CHESSBOARD_SIZE, CHESSBOARD_SIZE)
+    moves = {}
+    start_time = time.time()
+    for r in FIRST_MOVE_RANGE:
+        for c in FIRST_MOVE_RANGE:
+            chessboard.push(r, c)
+            expand(chessboard, teacher, book, moves)
+            chessboard.pop()
+        logger.info(f"First move row {r} done, {len(moves)} positions, spend time: "
+                    f"{round(time.time() - start_time, 2)}s.")
+    OpeningBook.save(BOOK_FILE, moves)
+    logger.info(f"Save {len(moves)} positions to {BOOK_FILE}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.base_board import ChessBoard
+from game.bit_board import BitChessBoard
+from game.cons import GAME_PLAYER
+from loguru import logger
+import numpy as np
+import random
+import time
+
+BOARD_SIZES = [(15, 15, 5), (7, 7, 5), (9, 11, 4)]
+GAME_NUM = 40
+POP_RATE = 0.2  # 每步以这个概率push后立刻pop
+SEED = 0
+
+
+def scan_results(chessboard: ChessBoard, board):
+    """
+    results of the full board scans of both players
+    """
+    results = []
+    for player in (GAME_PLAYER.PLAYER_ONE, GAME_PLAYER.PLAYER_TWO):
+        oppo = -player
+        for goal_num in (chessboard.goal_chess_num, chessboard.goal_chess_num - 1):
+            results.append(chessboard.is_player_winner(player, board, goal_num))
+        results.append(sorted(chessboard.search_player_livefour_step(board, player, oppo, current=True)))
+        results.append(sorted(chessboard.search_player_livefour_step(board, player, oppo, current=False)))
+        results.append(sorted(chessboard.search_player_one_side_four_step(board, player, oppo)))
+    return results
+
+
+def compare(board: ChessBoard, bit_board: BitChessBoard, check_board=True) -> list:
+    errors = []
+    for a, b in zip(board.get_last_pred_window_output(), bit_board.get_last_pred_window_output()):
+        if not np.array_equal(a, b):
+            errors.append("pred window")
+    empty = [board.is_empty(r, c) == bit_board.is_empty(r, c) and board.get_chess_value(r, c) ==
+             bit_board.get_chess_value(r, c) for r in range(board.row) for c in range(board.col)]
+    if not all(empty):
+        errors.append("is_empty / get_chess_value")
+    if board.zobrist_hash != bit_board.zobrist_hash:
+        errors.append("hash")
+    if check_board:
+        if not np.array_equal(board.board, bit_board.board):
+            errors.append("board")
+        if scan_results(board, board.board) != scan_results(bit_board, bit_board.board):
+            errors.append("scans")
+    return errors
+
+
+def check(row, col, goal_chess_num, rng: random.Random) -> int:
+    board = ChessBoard(row, col, goal_chess_num)
+    bit_board = BitChessBoard(row, col, goal_chess_num)
+    mismatches = 0
+    for game in range(GAME_NUM):
+        board.reset()
+        bit_board.reset()
+        while not board.game_end:
+            r, c = rng.choice(np.argwhere(board.board == 0).tolist())
+            if rng.random() < POP_RATE:
+                results = board.push(r, c), bit_board.push(r, c)
+                errors = compare(board, bit_board, check_board=rng.random() < 0.5)
+                results += board.pop(), bit_board.pop()
+            else:
+                results = board.move(r, c), bit_board.move(r, c)
+                # move以及history planes不读取board
+                errors = [] if bit_board._dirty else ["board is synchronized by move"]
+            errors += compare(board, bit_board, check_board=rng.random() < 0.5)
+            if results[0] != results[1] or (len(results) > 2 and results[2] != results[3]):
+                errors.append(f"move {results}")
+            if errors:
+                mismatches += 1
+                logger.error(f"{row}x{col}, goal {goal_chess_num}, steps {board.steps}: {errors}")
+    return mismatches
+
+
+def benchmark(row, col, goal_chess_num, rng: random.Random):
+    """
+    time of one move and of the full board scans on positions of random games
+    """
+    for board_class in (ChessBoard, BitChessBoard):
+        chessboard = board_class(row, col, goal_chess_num)
+        move_time = scan_time = 0.
+        moves = scans = 0
+        for _ in range(GAME_NUM // 4):
+            chessboard.reset()
+            while not chessboard.game_end:
+                cells = [(r, c) for r in range(row) for c in range(col) if chessboard.is_empty(r, c)]
+                step = rng.choice(cells)
+                start = time.perf_counter()
+                chessboard.move(*step)
+                move_time += time.perf_counter() - start
+                moves += 1
+                if moves % 4 == 0:
+                    board = chessboard.board
+                    start = time.perf_counter()
+                    scan_results(chessboard, board)
+                    scan_time += time.perf_counter() - start
+                    scans += 1
+        logger.info(f"{board_class.__name__} {row}x{col}: move {round(move_time / moves * 1e6, 1)}us, "
+                    f"scans of both players {round(scan_time / scans * 1e3, 3)}ms.")
+
+
+def main():
+    rng = random.Random(SEED)
+    mismatches = 0
+    for row, col, goal_chess_num in BOARD_SIZES:
+        mismatches += check(row, col, goal_chess_num, rng)
+    logger.info(f"Checked {len(BOARD_SIZES) * GAME_NUM} games, mismatches: {mismatches}.")
+    for row, col, goal_chess_num in BOARD_SIZES[:1] + [(19, 19, 5)]:
+        benchmark(row, col, goal_chess_num, rng)
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
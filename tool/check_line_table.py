@@ -0,0 +1,218 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from user.beta.agent import ChessAI, CHESS_TYPE, MAP_ENTRY_TYPE, LINE_CODE_WEIGHTS, PADDING, FIVE, FOUR, THREE, TWO, \
+    SFOUR, STHREE, STWO, get_line_type_counts, get_line_record_masks
+from loguru import logger
+import numpy as np
+
+CHESS_LEN = 9  # 线的中心放在棋盘中心，四个方向的线都在棋盘内
+DIR_OFFSET = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+
+class OriginalClassifier(object):
+    """
+    the branchy ChessAI.getLine / analysisLine used before the base-3 table, with the same logic, the counts are
+    written to `count`, the table must give the same chess types and records for every line
+    """
+    def __init__(self, chess_len):
+        self.len = chess_len
+        self.record = [[[0, 0, 0, 0] for x in range(chess_len)] for y in range(chess_len)]
+
+    def getLine(self, board, x, y, dir_offset, mine, opponent):
+        line = [0 for i in range(9)]
+        tmp_x = x + (-5 * dir_offset[0])
+        tmp_y = y + (-5 * dir_offset[1])
+        for i in range(9):
+            tmp_x += dir_offset[0]
+            tmp_y += dir_offset[1]
+            if (tmp_x < 0 or tmp_x >= self.len or
+                    tmp_y < 0 or tmp_y >= self.len):
+                line[i] = opponent  # set out of range as opponent chess
+            else:
+                line[i] = board[tmp_y][tmp_x]
+        return line
+
+    def analysisLine(self, board, x, y, dir_index, dir, mine, opponent, count):
+        def setRecord(self, x, y, left, right, dir_index, dir_offset):
+            tmp_x = x + (-5 + left) * dir_offset[0]
+            tmp_y = y + (-5 + left) * dir_offset[1]
+            for i in range(left, right + 1):
+                tmp_x += dir_offset[0]
+                tmp_y += dir_offset[1]
+                self.record[tmp_y][tmp_x][dir_index] = 1
+
+        empty = MAP_ENTRY_TYPE.MAP_EMPTY
+        left_idx, right_idx = 4, 4
+        line = self.getLine(board, x, y, dir, mine, opponent)
+        while right_idx < 8:
+            if line[right_idx + 1] != mine:
+                break
+            right_idx += 1
+        while left_idx > 0:
+            if line[left_idx - 1] != mine:
+                break
+            left_idx -= 1
+        left_range, right_range = left_idx, right_idx
+        while right_range < 8:
+            if line[right_range + 1] == opponent:
+                break
+            right_range += 1
+        while left_range > 0:
+            if line[left_range - 1] == opponent:
+                break
+            left_range -= 1
+        chess_range = right_range - left_range + 1
+        if chess_range < 5:
+            setRecord(self, x, y, left_range, right_range, dir_index, dir)
+            return CHESS_TYPE.NONE
+        setRecord(self, x, y, left_idx, right_idx, dir_index, dir)
+        m_range = right_idx - left_idx + 1
+        if m_range >= 5:
+            count[FIVE] += 1
+        if m_range == 4:
+            left_empty = right_empty = False
+            if line[left_idx - 1] == empty:
+                left_empty = True
+            if line[right_idx + 1] == empty:
+                right_empty = True
+            if left_empty and right_empty:
+                count[FOUR] += 1
+            elif left_empty or right_empty:
+                count[SFOUR] += 1
+        if m_range == 3:
+            left_empty = right_empty = False
+            left_four = right_four = False
+            if line[left_idx - 1] == empty:
+                if line[left_idx - 2] == mine:  # MXMMM
+                    setRecord(self, x, y, left_idx - 2, left_idx - 1, dir_index, dir)
+                    count[SFOUR] += 1
+                    left_four = True
+                left_empty = True
+            if line[right_idx + 1] == empty:
+                if line[right_idx + 2] == mine:  # MMMXM
+                    setRecord(self, x, y, right_idx + 1, right_idx + 2, dir_index, dir)
+                    count[SFOUR] += 1
+                    right_four = True
+                right_empty = True
+
+            if left_four or right_four:
+                pass
+            elif left_empty and right_empty:
+                if chess_range > 5:  # XMMMXX, XXMMMX
+                    count[THREE] += 1
+                else:  # PXMMMXP
+                    count[STHREE] += 1
+            elif left_empty or right_empty:  # PMMMX, XMMMP
+                count[STHREE] += 1
+        if m_range == 2:
+            left_empty = right_empty = False
+            left_three = right_three = False
+            if line[left_idx - 1] == empty:
+                if line[left_idx - 2] == mine:
+                    setRecord(self, x, y, left_idx - 2, left_idx - 1, dir_index, dir)
+                    if line[left_idx - 3] == empty:
+                        if line[right_idx + 1] == empty:  # XMXMMX
+                            count[THREE] += 1
+                        else:  # XMXMMP
+                            count[STHREE] += 1
+                        left_three = True
+                    elif line[left_idx - 3] == opponent:  # PMXMMX
+                        if line[right_idx + 1] == empty:
+                            count[STHREE] += 1
+                            left_three = True
+                left_empty = True
+            if line[right_idx + 1] == empty:
+                if line[right_idx + 2] == mine:
+                    if line[right_idx + 3] == mine:  # MMXMM
+                        setRecord(self, x, y, right_idx + 1, right_idx + 2, dir_index, dir)
+                        count[SFOUR] += 1
+                        right_three = True
+                    elif line[right_idx + 3] == empty:
+                        if left_empty:  # XMMXMX
+                            count[THREE] += 1
+                        else:  # PMMXMX
+                            count[STHREE] += 1
+                        right_three = True
+                    elif left_empty:  # XMMXMP
+                        count[STHREE] += 1
+                        right_three = True
+                right_empty = True
+            if left_three or right_three:
+                pass
+            elif left_empty and right_empty:  # XMMX
+                count[TWO] += 1
+            elif left_empty or right_empty:  # PMMX, XMMP
+                count[STWO] += 1
+        if m_range == 1:
+            left_empty = right_empty = False
+            if line[left_idx - 1] == empty:
+                if line[left_idx - 2] == mine:
+                    if line[left_idx - 3] == empty:
+                        if line[right_idx + 1] == opponent:  # XMXMP
+                            count[STWO] += 1
+                left_empty = True
+
+            if line[right_idx + 1] == empty:
+                if line[right_idx + 2] == mine:
+                    if line[right_idx + 3] == empty:
+                        if left_empty:  # XMXMX
+                            count[TWO] += 1
+                        else:  # PMXMX
+                            count[STWO] += 1
+                elif line[right_idx + 2] == empty:
+                    if line[right_idx + 3] == mine and line[right_idx + 4] == empty:  # XMXXMX
+                        count[TWO] += 1
+        return CHESS_TYPE.NONE
+
+
+def main():
+    """
+    所有中心为自己棋子的长度为9的线(3^8种)，双方、四个方向，比较原来的分类和get_line_type_counts /
+    get_line_record_masks，以及ChessAI.analysisLine在填充后的棋盘上查表的结果
+    """
+    type_counts = get_line_type_counts()
+    record_masks = get_line_record_masks()
+    ai = ChessAI(CHESS_LEN)
+    center = CHESS_LEN // 2
+    padded_center = (center + PADDING) * ai.width + center + PADDING
+    checked = mismatches = 0
+    for code in range(3 ** len(LINE_CODE_WEIGHTS)):
+        line = [code // weight % 3 for weight in LINE_CODE_WEIGHTS]
+        if line[4] != 1:
+            continue
+        for mine in (MAP_ENTRY_TYPE.MAP_PLAYER_ONE, MAP_ENTRY_TYPE.MAP_PLAYER_TWO):
+            opponent = MAP_ENTRY_TYPE.MAP_PLAYER_TWO if mine == MAP_ENTRY_TYPE.MAP_PLAYER_ONE \
+                else MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+            values = [MAP_ENTRY_TYPE.MAP_EMPTY, mine, opponent]
+            for dir_index, (dx, dy) in enumerate(DIR_OFFSET):
+                board = np.zeros((CHESS_LEN, CHESS_LEN), dtype=int)
+                for i, value in enumerate(line):
+                    board[center + (i - 4) * dy, center + (i - 4) * dx] = values[value]
+                original = OriginalClassifier(CHESS_LEN)
+                original_count = [0] * 8
+                original.analysisLine(board.tolist(), center, center, dir_index, DIR_OFFSET[dir_index], mine,
+                                      opponent, original_count)
+                original_mask = sum(1 << i for i in range(9)
+                                    if original.record[center + (i - 4) * dy][center + (i - 4) * dx][dir_index])
+
+                ai.setSearchBoard(board)
+                ai.record.fill(0)
+                count = np.zeros(8, dtype=np.int32)
+                ai.analysisLine(ai.board, padded_center, dir_index, mine, count)
+                step = ai.dir_steps[dir_index]
+                mask = sum(1 << i for i in range(9) if ai.record[padded_center + (i - 4) * step, dir_index])
+
+                checked += 1
+                if (list(type_counts[code]) != original_count or record_masks[code] != original_mask
+                        or list(count) != original_count or mask != original_mask):
+                    mismatches += 1
+                    logger.error(f"line {line}, player {int(mine)}, direction {DIR_OFFSET[dir_index]}: "
+                                 f"original {original_count} {original_mask:09b}, table {list(type_counts[code])} "
+                                 f"{record_masks[code]:09b}, analysisLine {list(count)} {mask:09b}")
+    logger.info(f"Checked {checked} lines, mismatches: {mismatches}.")
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
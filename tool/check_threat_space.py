@@ -0,0 +1,109 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game.base_board import ChessBoard
+from game.threat_index import ThreatIndex
+from game.threat_space import ThreatSpaceSearch
+from user.beta.agent import ChessAI
+from loguru import logger
+import numpy as np
+import random
+import time
+
+CHESSBOARD_SIZE = 15
+GAME_NUM = 300
+SEED = 0
+MAX_ATTACKER_MOVES = 20  # 验证时攻击方最多的步数
+DEFEND_RADIUS = 2  # 防守方尝试距离任意棋子DEFEND_RADIUS以内的所有空点
+
+
+def get_positions():
+    # ChessAI深度2和随机落子混合的对局，随机截取局面
+    ai = ChessAI(CHESSBOARD_SIZE, search_depth=2)
+    rng = random.Random(SEED)
+    positions = []
+    for _ in range(GAME_NUM):
+        chessboard = ChessBoard(CHESSBOARD_SIZE, CHESSBOARD_SIZE)
+        for _ in range(rng.randint(6, 40)):
+            if rng.random() < 0.4:
+                r, c = rng.choice(np.argwhere(chessboard.board == 0).tolist())
+            else:
+                r, c = ai.predict_step(chessboard, first_random=False)
+            if chessboard.move(int(r), int(c))[0] != 0:
+                break
+        if not chessboard.game_end:
+            positions.append(chessboard)
+    return positions
+
+
+class ExhaustiveDefender(object):
+    """
+    check a winning move of ThreatSpaceSearch: the attacker keeps playing the moves of the solver, the defender tries
+    every empty cell near the stones, the attacker must make five in every line
+    """
+    def __init__(self, solver: ThreatSpaceSearch):
+        self.solver = solver
+        self.cache = {}
+
+    def attack(self, chessboard: ChessBoard, attacker, moves_left) -> bool:
+        if moves_left <= 0:
+            return False
+        key = (chessboard.zobrist_hash, True, moves_left)
+        if key not in self.cache:
+            step = self.solver.solve(chessboard.board, attacker)
+            win = False
+            if step is not None:
+                status, _ = chessboard.push(*step)
+                win = status == 1 or (status == 0 and self.defend(chessboard, attacker, moves_left - 1))
+                chessboard.pop()
+            self.cache[key] = win
+        return self.cache[key]
+
+    def defend(self, chessboard: ChessBoard, attacker, moves_left) -> bool:
+        key = (chessboard.zobrist_hash, False, moves_left)
+        if key not in self.cache:
+            stones = chessboard.board != 0
+            near = np.zeros_like(stones)
+            for dr in range(-DEFEND_RADIUS, DEFEND_RADIUS + 1):
+                for dc in range(-DEFEND_RADIUS, DEFEND_RADIUS + 1):
+                    near[max(dr, 0):chessboard.row + min(dr, 0), max(dc, 0):chessboard.col + min(dc, 0)] |= \
+                        stones[max(-dr, 0):chessboard.row + min(-dr, 0), max(-dc, 0):chessboard.col + min(-dc, 0)]
+            win = True
+            for r, c in np.argwhere(near & ~stones).tolist():
+                status, _ = chessboard.push(r, c)
+                if status != 0:
+                    # 防守方连五或者平局
+                    win = False
+                elif status == 0 and not chessboard.threat_index.get_points(ThreatIndex.WIN, attacker):
+                    # 攻击方不能直接连五时才需要继续验证
+                    win = self.attack(chessboard, attacker, moves_left)
+                chessboard.pop()
+                if not win:
+                    break
+            self.cache[key] = win
+        return self.cache[key]
+
+
+def main():
+    solver = ThreatSpaceSearch(CHESSBOARD_SIZE, CHESSBOARD_SIZE)
+    defender = ExhaustiveDefender(solver)
+    positions = get_positions()
+    found = {False: 0, True: 0}
+    failed = 0
+    start_time = time.time()
+    for chessboard in positions:
+        player = chessboard.current_player
+        vcf = solver.solve(chessboard.board, player, vct=False) is not None
+        if not vcf and solver.solve(chessboard.board, player) is None:
+            continue
+        found[not vcf] += 1
+        if not defender.attack(chessboard, player, MAX_ATTACKER_MOVES):
+            failed += 1
+            logger.error(f"{'VCF' if vcf else 'VCT'} win is refuted, steps: {chessboard.steps}")
+    logger.info(f"{len(positions)} positions, VCF wins: {found[False]}, VCT wins: {found[True]}, refuted: {failed}, "
+                f"spend time: {round(time.time() - start_time, 2)}s.")
+    return failed
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -15,11 +15,19 @@ CHESSBOARD_SIZE = 15
 SHOW_LOSS_STEP = 4
 SAVE_MODEL_STEP = 20
 PROCESS = 4
+TEACHER_MOVE_TIME = None  # teacher每步的搜索时间(秒)，None为固定深度搜索
+TEACHER_JIT = True  # 固定深度搜索使用numba编译的版本，没有安装numba时使用python的搜索
+OPENING_BOOK_FILE = "data/opening_book.npy"  # tool/build_opening_book.py生成的开局库，文件不存在时不使用
+TEACHER_CACHE_FILE = "data/teacher_cache.sqlite"  # teacher固定深度搜索的走法缓存，所有进程共用
+# 缓存按对称后的局面保存，旋转、翻转的局面共用第一次搜索得到的走法(对称变换后)，同分走法的选择可能和直接搜索这个局面
+# 不同，所以训练标签可能和不使用缓存时不同，只是对称局面的另一个最佳走法，设为None时每步都重新搜索
 EPOCH = 100000
 
 
 def main():
-    teacher = ChessAI(CHESSBOARD_SIZE)
+    teacher = ChessAI(CHESSBOARD_SIZE, max_time=TEACHER_MOVE_TIME, jit=TEACHER_JIT,
+                      opening_book=OPENING_BOOK_FILE if os.path.exists(OPENING_BOOK_FILE) else None,
+                      move_cache=TEACHER_CACHE_FILE)
     agent = Transformer_Gobang(CHESSBOARD_SIZE, CHESSBOARD_SIZE, train=True, model_file=MODEL_FILE_LOAD)
     game = Game(CHESSBOARD_SIZE)
     total_loss = -1.
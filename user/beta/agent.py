@@ -1,7 +1,15 @@
 from game.cons import GAME_PLAYER
 from game.base_board import ChessBoard
+from game.zobrist import get_zobrist_keys
+from game.threat_space import ThreatSpaceSearch
+from game.opening_book import OpeningBook
+from user.beta.move_cache import MoveCache
+from user.beta.transposition import TranspositionTable, TURN_KEY, LIMITED_KEY
+from user.beta.parallel import ParallelRootSearch
+from loguru import logger
 import copy
 from enum import IntEnum
+from functools import lru_cache
 import numpy as np
 from random import randint
 import time
@@ -33,53 +41,390 @@ SCORE_FIVE, SCORE_FOUR, SCORE_SFOUR = 100000, 10000, 1000
 SCORE_THREE, SCORE_STHREE, SCORE_TWO, SCORE_STWO = 100, 10, 8, 2
 SEARCH_DEPTH = 5  # 搜索深度5
 LIMITED_MOVE_NUM = 10  # 限制步数10
+ASPIRATION_WINDOW = 1000  # 迭代加深根节点的aspiration窗口大小的一半
+LINE_CACHE_SIZE = 1 << 16  # 缓存的线的棋型个数上限
+ENGINE_VERSION = "1"  # 固定深度搜索的走法改变时(评估、走法生成等)需要修改，MoveCache中旧版本的走法不再使用
+PADDING = 5  # 棋盘四周填充的格数，getLine取长度为9的线时不用检查边界，多一格使(1, -1)方向切片的终点不小于0
+
+
+LINE_CODE_WEIGHTS = tuple(3 ** i for i in range(9))  # 长度为9的线的base-3编码
+
+
+def analysis_line(line):
+    """
+    判断一条线上自己棋能形成的棋型，line是以自己的棋子为中心长度为9的线，0为空，1为自己的棋，2为对手的棋或超出范围。
+    要根据中心点相邻己方棋子能连成的个数来分别判断，己方棋值设为M，对方棋值设为P，空点值设为X。
+    :return: 形成的棋型(可能重复)，线上已经检测过需要跳过的位置
+    """
+    mine, opponent, empty = 1, 2, 0
+    chess_types = []
+    records = set()
+
+    def setRecord(left, right):  # 标记已经检测过，需要跳过的棋子。
+        records.update(range(left, right + 1))
+
+    left_idx, right_idx = 4, 4
+    while right_idx < 8:
+        if line[right_idx + 1] != mine:
+            break
+        right_idx += 1
+    while left_idx > 0:
+        if line[left_idx - 1] != mine:
+            break
+        left_idx -= 1
+    left_range, right_range = left_idx, right_idx
+    while right_range < 8:
+        if line[right_range + 1] == opponent:
+            break
+        right_range += 1
+    while left_range > 0:
+        if line[left_range - 1] == opponent:
+            break
+        left_range -= 1
+    chess_range = right_range - left_range + 1
+    if chess_range < 5:
+        setRecord(left_range, right_range)
+        return tuple(chess_types), tuple(sorted(records))
+    setRecord(left_idx, right_idx)
+    m_range = right_idx - left_idx + 1
+    # M:自己的棋子, P:对手的棋子或者超出范围, X: 空
+    if m_range >= 5:
+        chess_types.append(FIVE)
+    # 活四的形式 : XMMMMX
+    # 冲四的形式 : XMMMMP, PMMMMX
+    if m_range == 4:
+        left_empty = right_empty = False
+        if line[left_idx - 1] == empty:
+            left_empty = True
+        if line[right_idx + 1] == empty:
+            right_empty = True
+        if left_empty and right_empty:
+            chess_types.append(FOUR)
+        elif left_empty or right_empty:
+            chess_types.append(SFOUR)
+    # 冲四 : MXMMM, MMMXM
+    # 活三 : XMMMXX, XXMMMX
+    # 眠三 : PMMMX, XMMMP, PXMMMXP
+    if m_range == 3:
+        left_empty = right_empty = False
+        left_four = right_four = False
+        if line[left_idx - 1] == empty:
+            if line[left_idx - 2] == mine:  # MXMMM
+                setRecord(left_idx - 2, left_idx - 1)
+                chess_types.append(SFOUR)
+                left_four = True
+            left_empty = True
+        if line[right_idx + 1] == empty:
+            if line[right_idx + 2] == mine:  # MMMXM
+                setRecord(right_idx + 1, right_idx + 2)
+                chess_types.append(SFOUR)
+                right_four = True
+            right_empty = True
+
+        if left_four or right_four:
+            pass
+        elif left_empty and right_empty:
+            if chess_range > 5:  # XMMMXX, XXMMMX
+                chess_types.append(THREE)
+            else:  # PXMMMXP
+                chess_types.append(STHREE)
+        elif left_empty or right_empty:  # PMMMX, XMMMP
+            chess_types.append(STHREE)
+    # 冲四: MMXMM
+    # 活三: XMXMMX, XMMXMX
+    # 眠三: PMXMMX, XMXMMP, PMMXMX, XMMXMP
+    # 活二: XMMX
+    # 眠二: PMMX, XMMP
+    if m_range == 2:
+        left_empty = right_empty = False
+        left_three = right_three = False
+        if line[left_idx - 1] == empty:
+            if line[left_idx - 2] == mine:
+                setRecord(left_idx - 2, left_idx - 1)
+                if line[left_idx - 3] == empty:
+                    if line[right_idx + 1] == empty:  # XMXMMX
+                        chess_types.append(THREE)
+                    else:  # XMXMMP
+                        chess_types.append(STHREE)
+                    left_three = True
+                elif line[left_idx - 3] == opponent:  # PMXMMX
+                    if line[right_idx + 1] == empty:
+                        chess_types.append(STHREE)
+                        left_three = True
+            left_empty = True
+        if line[right_idx + 1] == empty:
+            if line[right_idx + 2] == mine:
+                if line[right_idx + 3] == mine:  # MMXMM
+                    setRecord(right_idx + 1, right_idx + 2)
+                    chess_types.append(SFOUR)
+                    right_three = True
+                elif line[right_idx + 3] == empty:
+                    if left_empty:  # XMMXMX
+                        chess_types.append(THREE)
+                    else:  # PMMXMX
+                        chess_types.append(STHREE)
+                    right_three = True
+                elif left_empty:  # XMMXMP
+                    chess_types.append(STHREE)
+                    right_three = True
+            right_empty = True
+        if left_three or right_three:
+            pass
+        elif left_empty and right_empty:  # XMMX
+            chess_types.append(TWO)
+        elif left_empty or right_empty:  # PMMX, XMMP
+            chess_types.append(STWO)
+    # 活二: XMXMX, XMXXMX only check right direction
+    # 眠二: PMXMX, XMXMP
+    if m_range == 1:
+        left_empty = False
+        if line[left_idx - 1] == empty:
+            if line[left_idx - 2] == mine:
+                if line[left_idx - 3] == empty:
+                    if line[right_idx + 1] == opponent:  # XMXMP
+                        chess_types.append(STWO)
+            left_empty = True
+
+        if line[right_idx + 1] == empty:
+            if line[right_idx + 2] == mine:
+                if line[right_idx + 3] == empty:
+                    if left_empty:  # XMXMX
+                        chess_types.append(TWO)
+                    else:  # PMXMX
+                        chess_types.append(STWO)
+            elif line[right_idx + 2] == empty:
+                if line[right_idx + 3] == mine and line[right_idx + 4] == empty:  # XMXXMX
+                    chess_types.append(TWO)
+    return tuple(chess_types), tuple(sorted(records))
+
+
+@lru_cache(maxsize=None)
+def get_line_table():
+    """
+    所有中心为自己棋子的线的棋型表，table[线的base-3编码] = analysis_line(line)，中心不是自己棋子的编码为None
+    """
+    table = [None] * 3 ** len(LINE_CODE_WEIGHTS)
+    for code in range(3 ** len(LINE_CODE_WEIGHTS)):
+        line = [code // weight % 3 for weight in LINE_CODE_WEIGHTS]
+        if line[4] == 1:
+            table[code] = analysis_line(line)
+    return table
+
+
+@lru_cache(maxsize=None)
+def get_line_type_counts():
+    """
+    get_line_table的棋型个数数组，counts[code, chess_type]为编码是code的线上chess_type的个数
+    """
+    counts = np.zeros((3 ** len(LINE_CODE_WEIGHTS), 8), dtype=np.int32)
+    for code, entry in enumerate(get_line_table()):
+        if entry is not None:
+            for chess_type in entry[0]:
+                counts[code, chess_type] += 1
+    return counts
+
+
+@lru_cache(maxsize=None)
+def get_line_record_masks():
+    """
+    get_line_table需要标记的位置的位掩码，第i位为1表示线上的第i个位置需要标记
+    """
+    masks = np.zeros(3 ** len(LINE_CODE_WEIGHTS), dtype=np.int32)
+    for code, entry in enumerate(get_line_table()):
+        if entry is not None:
+            masks[code] = sum(1 << i for i in entry[1])
+    return masks
+
+
+def to_search_board(chessboard: ChessBoard):
+    """
+    ChessBoard -> numpy board and turn of ChessAI.search / genmove, the board is not converted to lists
+    """
+    board = np.array(chessboard.board)
+    board[chessboard.board == GAME_PLAYER.PLAYER_ONE] = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+    board[chessboard.board == GAME_PLAYER.PLAYER_TWO] = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
+    if chessboard.current_player == GAME_PLAYER.PLAYER_ONE:
+        turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+    else:
+        turn = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
+    return board, turn
+
+
+class SearchAbort(Exception):
+    # 搜索超出了时间或节点数限制
+    pass
 
 
 class ChessAI():  # chessAI类
-    def __init__(self, chess_len):
+    def __init__(self, chess_len, tt_size_mb=16, radius=1, search_depth=SEARCH_DEPTH, max_time=None, max_nodes=None,
+                 history_heuristic=True, pvs=False, threat_search=False, workers=1, batch_score=True,
+                 jit=False, opening_book=None, move_cache=None):
+        """
+        :param tt_size_mb: memory cap of the transposition table, 0 to disable it
+        :param radius: genmove only tries the empty points within radius of a chess
+        :param search_depth: search depth of predict_step, the max depth of iterative deepening if a limit is set
+        :param max_time: seconds per move, predict_step uses iterative deepening if max_time or max_nodes is set
+        :param max_nodes: searched nodes per move
+        :param history_heuristic: order the moves below the root by killer moves and the history table
+        :param pvs: principal variation search, and aspiration windows at the root of iterative deepening
+        :param threat_search: predict_step plays the VCF/VCT win found by ThreatSpaceSearch before the main search
+        :param workers: split the root moves of search to a pool of workers processes if workers > 1
+        :param batch_score: genmove scores all candidate points together with numpy (evaluatePointScores), the
+        moves are the same as scoring them one by one with evaluatePointScore
+        :param jit: fixed depth searches use the numba compiled search of user/beta/jit.py if numba is installed,
+        the results are the same as the python search
+        :param opening_book: opening book file (see OpeningBook), predict_step plays the book move before any search
+        :param move_cache: SQLite file of MoveCache, the moves of fixed depth searches are cached by position
+        """
+        if radius > PADDING:
+            raise ValueError(f"radius should be at most {PADDING}, got {radius}")
         self.len = chess_len  # 棋盘长度
-        self.record = [[[0, 0, 0, 0] for x in range(chess_len)] for y in range(chess_len)]  # record数组记录所有位置的四个方向是否被检测过
-        self.count = [[0 for x in range(8)] for i in range(2)]  # count二维数组记录黑棋和白棋的棋型个数统计。
-        self.pos_score = [[(7 - max(abs(x - 7), abs(y - 7))) for x in range(chess_len)] for y in
-                          range(chess_len)]  # pose_core给棋盘上每个位置设一个初始分数，越靠近棋盘中心，分数越高，用来在最开始没有任何棋型时的，AI优先选取靠中心的位置。
+        # 棋盘四周填充PADDING格MAP_NONE，按行展开成一维数组，位置(x, y)的下标为(y + PADDING) * width + x + PADDING
+        self.width = chess_len + 2 * PADDING
+        self.board = np.full(self.width * self.width, MAP_ENTRY_TYPE.MAP_NONE, dtype=np.int8)
+        self.record = np.zeros((self.width * self.width, 4), dtype=np.uint8)  # record数组记录所有位置的四个方向是否被检测过
+        self.count = np.zeros((2, 8), dtype=np.int32)  # count二维数组记录黑棋和白棋的棋型个数统计。
+        # pose_core给棋盘上每个位置设一个初始分数，越靠近棋盘中心，分数越高，用来在最开始没有任何棋型时的，AI优先选取靠中心的位置。
+        self.pos_score = np.array([[(7 - max(abs(x - 7), abs(y - 7))) for x in range(chess_len)] for y in
+                                   range(chess_len)], dtype=np.int32)
+        # 置换表: 以搜索棋盘的zobrist hash为key，保存搜索深度、分数类型、分数和最佳走法
+        self.tt_size_mb = tt_size_mb
+        self.table = TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None
+        keys = get_zobrist_keys(chess_len, chess_len)
+        self.zobrist_keys = {MAP_ENTRY_TYPE.MAP_PLAYER_ONE: keys[GAME_PLAYER.PLAYER_ONE],
+                             MAP_ENTRY_TYPE.MAP_PLAYER_TWO: keys[GAME_PLAYER.PLAYER_TWO]}
+        self.line_table = get_line_table()  # 线的编码 -> (棋型, 需要标记的位置)
+        self.line_patterns = ({}, {})  # 双方getLine得到的线 -> (棋型, 需要标记的位置)
+        # 增量评估: 棋盘上每个方向的每条完整的线分别统计双方的棋型个数，落子或提子时只重新统计经过它的四条线
+        dir_offset = [(1, 0), (0, 1), (1, 1), (1, -1)]
+        self.dir_steps = tuple(dy * self.width + dx for dx, dy in dir_offset)  # 四个方向在一维棋盘上的步长
+        self.lines = []  # 线上的位置，按dir_offset方向排列
+        self.line_dirs = []
+        self.cell_lines = [None] * (self.width * self.width)
+        cell_lines = {}
+        for i, (dx, dy) in enumerate(dir_offset):
+            for y in range(chess_len):
+                for x in range(chess_len):
+                    if 0 <= x - dx < chess_len and 0 <= y - dy < chess_len:
+                        continue
+                    cells = []
+                    tmp_x, tmp_y = x, y
+                    while 0 <= tmp_x < chess_len and 0 <= tmp_y < chess_len:
+                        cell = (tmp_y + PADDING) * self.width + tmp_x + PADDING
+                        cell_lines.setdefault(cell, [0] * 4)[i] = len(self.lines)
+                        cells.append(cell)
+                        tmp_x, tmp_y = tmp_x + dx, tmp_y + dy
+                    self.lines.append(np.array(cells))
+                    self.line_dirs.append(i)
+        for cell, line_ids in cell_lines.items():
+            self.cell_lines[cell] = tuple(line_ids)
+        self.empty_counts = np.zeros((2, 8), dtype=np.int32)
+        self.line_counts = [self.empty_counts] * len(self.lines)
+        self.total_count = np.zeros((2, 8), dtype=np.int32)
+        self.line_cache = {}  # (方向, 线上的值) -> 双方的棋型个数
+        # 候选点: 搜索棋盘上radius范围内有棋子的空点，neighbor_num记录每个点radius范围内的棋子数，
+        # frontier是候选点的集合，落子和提子时只更新周围radius范围内的点
+        self.radius = radius
+        self.neighbor_num = [0] * (self.width * self.width)
+        self.neighbor_offsets = tuple(i * self.width + j for i in range(-radius, radius + 1)
+                                      for j in range(-radius, radius + 1))
+        self.frontier = set()
+        # 候选点的evaluatePointScore缓存: (黑棋在该点的得分, 白棋在该点的得分)，该点所在的四条线上距离4以内有变化时失效
+        self.point_scores = np.zeros((self.width * self.width, 2), dtype=np.int32)
+        self.point_valid = np.zeros(self.width * self.width, dtype=bool)
+        self.point_offsets = np.array([i * step for step in self.dir_steps for i in range(-4, 5)])
+        # 批量评分: 候选点四个方向上长度为9的线的偏移，线上的值 -> 双方各自的base-3编码中的数字
+        self.batch_score = batch_score
+        self.line_offsets = self.point_offsets.reshape(4, 9)
+        self.line_digits = np.array([[0, 1, 2, 2], [0, 2, 1, 2]], dtype=np.int32)
+        self.line_type_counts = get_line_type_counts()
+        self.search_board = None  # 增量统计对应的棋盘
+        self.hash = 0
+        self.search_depth = search_depth
+        self.max_time = max_time
+        self.max_nodes = max_nodes
+        self.maxdepth = search_depth
+        self.alpha = 0  # 生成的走法数
+        self.belta = 0  # 搜索的走法数
+        self.expanded = 0  # 生成了走法的节点数
+        self.cutoffs = 0  # 发生beta剪枝的节点数
+        self.first_cutoffs = 0  # 第一个走法就发生beta剪枝的节点数
+        # 走法排序: 每一层的两个killer走法(最近发生beta剪枝的走法)，每个位置的history分数(发生beta剪枝时加depth * depth)
+        self.history_heuristic = history_heuristic
+        self.killers = []
+        self.history = np.zeros((chess_len, chess_len), dtype=np.int32)
+        # 迭代加深: 搜索的节点数、限制和上一次迭代的最佳走法
+        self.nodes = 0
+        self.limited = False
+        self.deadline = float("inf")
+        self.node_limit = float("inf")
+        self.pv_move = None
+        self.pv_score = None
+        self.pvs = pvs
+        self.depth = 0  # 最近一次迭代加深完成的深度
+        self.threat_search = ThreatSpaceSearch(chess_len, chess_len) if threat_search else None
+        self.opening_book = OpeningBook(chess_len, chess_len, opening_book) if opening_book is not None else None
+        self.move_cache = None
+        if move_cache is not None:
+            self.move_cache = MoveCache(chess_len, chess_len, move_cache, version=f"{ENGINE_VERSION}-radius{radius}")
+        # 多进程搜索，进程池在第一次搜索时创建
+        self.workers = workers
+        self.worker_kwargs = dict(radius=radius, history_heuristic=history_heuristic, pvs=pvs, batch_score=batch_score)
+        self.parallel = None
+        # 编译的固定深度搜索，没有安装numba时使用python的搜索
+        self.jit_search = None
+        if jit:
+            from user.beta.jit import NUMBA_AVAILABLE, search_root
+            if NUMBA_AVAILABLE:
+                self.jit_search = search_root
+                self.jit_steps = np.array(self.dir_steps)
+                self.jit_params = np.array([self.width, PADDING, radius, 0])
+                self.line_record_masks = get_line_record_masks()
+            else:
+                logger.warning("numba is not installed, ChessAI uses the python search.")
 
     def reset(self):  # reset函数：每次调用评估函数前都需要清一下之前的统计数据。
-        for y in range(self.len):
-            for x in range(self.len):
-                for i in range(4):
-                    self.record[y][x][i] = 0  # 将以前的数据清零
-
-        for i in range(len(self.count)):
-            for j in range(len(self.count[0])):
-                self.count[i][j] = 0  # 将以前的数据清零
+        self.record.fill(0)
+        self.count.fill(0)
 
     # 判断位置的得分
-    def evaluatePointScore(self, board, x, y, mine, opponent):
-        dir_offset = [(1, 0), (0, 1), (1, 1), (1, -1)]
-        for i in range(len(self.count)):
-            for j in range(len(self.count[0])):
-                self.count[i][j] = 0
-        board[y][x] = mine
-        self.evaluatePoint(board, x, y, mine, opponent, self.count[mine - 1])
+    def evaluatePointScore(self, board, cell, mine, opponent):
+        if board is self.search_board:
+            if not self.point_valid[cell]:
+                self.point_scores[cell] = self.analysisPointScore(board, cell, MAP_ENTRY_TYPE.MAP_PLAYER_ONE,
+                                                                  MAP_ENTRY_TYPE.MAP_PLAYER_TWO)
+                self.point_valid[cell] = True
+            scores = self.point_scores[cell].tolist()
+            return scores if mine == MAP_ENTRY_TYPE.MAP_PLAYER_ONE else scores[::-1]
+        return self.analysisPointScore(board, cell, mine, opponent)
+
+    def analysisPointScore(self, board, cell, mine, opponent):
+        self.count.fill(0)
         mine_count = self.count[mine - 1]
-        board[y][x] = opponent
-        self.evaluatePoint(board, x, y, opponent, mine, self.count[opponent - 1])
         opponent_count = self.count[opponent - 1]
-        board[y][x] = 0
-        mscore = self.getPointScore(mine_count)
-        oscore = self.getPointScore(opponent_count)
+        board[cell] = mine
+        self.evaluatePoint(board, cell, mine, opponent, mine_count)
+        board[cell] = opponent
+        self.evaluatePoint(board, cell, opponent, mine, opponent_count)
+        board[cell] = 0
+        mscore = self.getPointScore(mine_count.tolist())
+        oscore = self.getPointScore(opponent_count.tolist())
         return mscore, oscore
 
-    def hasNeighbor(self, board, x, y, radius):
-        start_x, end_x = (x - radius), (x + radius)
-        start_y, end_y = (y - radius), (y + radius)
+    def getNeighborNum(self, board):
+        # 每个位置radius范围内的棋子数，填充的格子不算棋子
+        stones = ((board == MAP_ENTRY_TYPE.MAP_PLAYER_ONE) | (board == MAP_ENTRY_TYPE.MAP_PLAYER_TWO)).astype(np.int32)
+        neighbor_num = np.zeros_like(stones)
+        for i in range(-self.radius, self.radius + 1):
+            for j in range(-self.radius, self.radius + 1):
+                neighbor_num += np.roll(stones, i * self.width + j)
+        return neighbor_num
 
-        for i in range(start_y, end_y + 1):
-            for j in range(start_x, end_x + 1):
-                if 0 <= i < self.len and 0 <= j < self.len:
-                    if board[i][j] != 0:
-                        return True
-        return False
+    def getPaddedBoard(self, board):
+        # 二维棋盘 -> 填充后的一维棋盘
+        padded = np.full((self.width, self.width), MAP_ENTRY_TYPE.MAP_NONE, dtype=np.int8)
+        padded[PADDING:-PADDING, PADDING:-PADDING] = board
+        return padded.ravel()
 
     def genmove(self, board, turn):  # 通过 genmove 函数获取棋盘上所有的空点，然后依次尝试，获得评分最高的位置并返回。
         fives = []
@@ -92,23 +437,29 @@ class ChessAI():  # chessAI类
             mine = 2
             opponent = 1
         moves = []
-        radius = 1
-        for y in range(self.len):
-            for x in range(self.len):
-                if board[y][x] == 0 and self.hasNeighbor(board, x, y, radius):
-                    mscore, oscore = self.evaluatePointScore(board, x, y, mine, opponent)
-                    point = (max(mscore, oscore), x, y)
-                    if mscore >= SCORE_FIVE or oscore >= SCORE_FIVE:
-                        fives.append(point)
-                    elif mscore >= SCORE_FOUR:
-                        mfours.append(point)
-                    elif oscore >= SCORE_FOUR:
-                        ofours.append(point)
-                    elif mscore >= SCORE_SFOUR:
-                        msfours.append(point)
-                    elif oscore >= SCORE_SFOUR:
-                        osfours.append(point)
-                    moves.append(point)
+        # radius范围内有棋子的空点，按行排列
+        if board is self.search_board:
+            cells = sorted(self.frontier)
+        else:
+            board = self.getPaddedBoard(board)
+            cells = np.flatnonzero((board == MAP_ENTRY_TYPE.MAP_EMPTY) & (self.getNeighborNum(board) > 0)).tolist()
+        if self.batch_score:
+            return self.batchGenmove(board, np.array(cells, dtype=np.intp), mine)
+        for cell in cells:
+            mscore, oscore = self.evaluatePointScore(board, cell, mine, opponent)
+            y, x = divmod(cell, self.width)
+            point = (max(mscore, oscore), x - PADDING, y - PADDING)
+            if mscore >= SCORE_FIVE or oscore >= SCORE_FIVE:
+                fives.append(point)
+            elif mscore >= SCORE_FOUR:
+                mfours.append(point)
+            elif oscore >= SCORE_FOUR:
+                ofours.append(point)
+            elif mscore >= SCORE_SFOUR:
+                msfours.append(point)
+            elif oscore >= SCORE_SFOUR:
+                osfours.append(point)
+            moves.append(point)
         if len(fives) > 0:
             return fives
         if len(mfours) > 0:
@@ -123,59 +474,377 @@ class ChessAI():  # chessAI类
             moves = moves[:LIMITED_MOVE_NUM]
         return moves
 
+    def batchGenmove(self, board, cells, mine):
+        # 和genmove相同的走法，候选点的得分用evaluatePointScores一起计算
+        if board is self.search_board:
+            invalid = cells[~self.point_valid[cells]]
+            if len(invalid) > 0:
+                self.point_scores[invalid] = self.evaluatePointScores(board, invalid)
+                self.point_valid[invalid] = True
+            scores = self.point_scores[cells]
+        else:
+            scores = self.evaluatePointScores(board, cells)
+        if mine == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
+            mscores, oscores = scores[:, 0], scores[:, 1]
+        else:
+            mscores, oscores = scores[:, 1], scores[:, 0]
+        ys, xs = np.divmod(cells, self.width)
+        points = np.stack([np.maximum(mscores, oscores), xs - PADDING, ys - PADDING], axis=1)
+        fives = (mscores >= SCORE_FIVE) | (oscores >= SCORE_FIVE)
+        if fives.any():
+            return list(map(tuple, points[fives].tolist()))
+        mfours = mscores >= SCORE_FOUR
+        if mfours.any():
+            return list(map(tuple, points[mfours].tolist()))
+        ofours = oscores >= SCORE_FOUR
+        if ofours.any():
+            msfours = ~ofours & (mscores >= SCORE_SFOUR)
+            return list(map(tuple, points[ofours].tolist() + points[msfours].tolist()))
+        # 和moves.sort(reverse=True)相同的顺序
+        points = points[np.lexsort(points.T[::-1])[::-1]]
+        if self.maxdepth > 2 and len(points) > LIMITED_MOVE_NUM:
+            points = points[:LIMITED_MOVE_NUM]
+        return list(map(tuple, points.tolist()))
+
+    def evaluatePointScores(self, board, cells):
+        """
+        和analysisPointScore相同的得分，一次计算多个空点
+        :param board: 填充后的一维棋盘
+        :param cells: 空点的位置
+        :return: [len(cells), 2] 黑棋和白棋在各个点的得分
+        """
+        lines = board[cells[:, None, None] + self.line_offsets]
+        scores = np.empty((len(cells), 2), dtype=np.int32)
+        for player in range(2):
+            # 中心是空点，编码加上中心为自己的棋的数字1
+            codes = self.line_digits[player][lines] @ np.array(LINE_CODE_WEIGHTS) + LINE_CODE_WEIGHTS[4]
+            scores[:, player] = self.getPointScores(self.line_type_counts[codes].sum(axis=1))
+        return scores
+
     def __search(self, board, turn, depth, alpha=SCORE_MIN, beta=SCORE_MAX):
+        self.nodes += 1
+        if self.limited and (self.nodes > self.node_limit or (self.nodes & 0x3f == 0 and time.time() > self.deadline)):
+            raise SearchAbort()
         score = self.evaluate(board, turn)
         if depth <= 0 or abs(score) >= SCORE_FIVE:
             return score
+        # 置换表只使用相同深度的结果，搜索结果与不使用置换表时完全一致
+        key, table_move = None, None
+        if self.table is not None:
+            key = self.hash ^ (TURN_KEY if turn == MAP_ENTRY_TYPE.MAP_PLAYER_TWO else 0) ^ \
+                (LIMITED_KEY if self.maxdepth > 2 else 0)
+            entry = self.table.probe(key)
+            if entry is not None:
+                table_depth, flag, table_score, table_move = entry
+                if table_depth == depth and depth != self.maxdepth:
+                    if flag == TranspositionTable.EXACT or \
+                            (flag == TranspositionTable.LOWER and table_score >= beta):
+                        return max(table_score, alpha)
+                    if flag == TranspositionTable.UPPER and table_score <= alpha:
+                        return alpha
         moves = self.genmove(board, turn)
         bestmove = None
         self.alpha += len(moves)
         # 如果没有移动，则返回分数
         if len(moves) == 0:
             return score
-        for _, x, y in moves:
-            board[y][x] = turn
+        self.expanded += 1
+        ply = self.maxdepth - depth
+        if self.history_heuristic and depth != self.maxdepth and len(moves) > 1:
+            # 只改变搜索顺序，不改变生成的走法: killer走法在前，其余按静态分数排序，分数相同时history分数高的在前
+            killers = self.killers[ply]
+            history = self.history
+            moves.sort(key=lambda move: (2 if move[1:] == killers[0] else 1 if move[1:] == killers[1] else 0,
+                                         move[0], history[move[2], move[1]]), reverse=True)
+        if table_move is not None and depth != self.maxdepth:
+            # 置换表中的最佳走法最先搜索
+            for i in range(1, len(moves)):
+                if moves[i][2] * self.len + moves[i][1] == table_move:
+                    moves.insert(0, moves.pop(i))
+                    break
+        if self.pv_move is not None and depth == self.maxdepth:
+            # 上一次迭代的最佳走法最先搜索
+            for i in range(1, len(moves)):
+                if moves[i][1:] == self.pv_move:
+                    moves.insert(0, moves.pop(i))
+                    break
+        origin_alpha = alpha
+        for i, (_, x, y) in enumerate(moves):
+            cell = (y + PADDING) * self.width + x + PADDING
+            board[cell] = turn
+            self.updateSearchBoard(board, cell)
+            self.hash ^= self.zobrist_keys[turn][y * self.len + x]
             if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
                 op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
             else:
                 op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
-            score = - self.__search(board, op_turn, depth - 1, -beta, -alpha)
-            board[y][x] = 0
+            if self.pvs and i > 0:
+                # 后面的走法先用空窗口检查是否比alpha好，好的话再用完整窗口重新搜索
+                score = - self.__search(board, op_turn, depth - 1, -alpha - 1, -alpha)
+                if alpha < score < beta:
+                    score = - self.__search(board, op_turn, depth - 1, -beta, -alpha)
+            else:
+                score = - self.__search(board, op_turn, depth - 1, -beta, -alpha)
+            board[cell] = 0
+            self.updateSearchBoard(board, cell)
+            self.hash ^= self.zobrist_keys[turn][y * self.len + x]
             self.belta += 1
             # alpha/beta 剪枝
             if score > alpha:
                 alpha = score
                 bestmove = (x, y)
                 if alpha >= beta:
+                    self.cutoffs += 1
+                    if i == 0:
+                        self.first_cutoffs += 1
+                    if depth != self.maxdepth:
+                        killers = self.killers[ply]
+                        if killers[0] != bestmove:
+                            killers[1] = killers[0]
+                            killers[0] = bestmove
+                        self.history[y, x] += depth * depth
                     break
+        if key is not None:
+            if bestmove is None:
+                self.table.store(key, depth, TranspositionTable.UPPER, origin_alpha, None)
+            else:
+                flag = TranspositionTable.LOWER if alpha >= beta else TranspositionTable.EXACT
+                self.table.store(key, depth, flag, alpha, bestmove[1] * self.len + bestmove[0])
         if depth == self.maxdepth and bestmove:
             self.bestmove = bestmove
         return alpha
 
-    def search(self, board, turn, depth=5):
+    def __getstate__(self):
+        # 复制到其它进程时不带进程池、置换表和缓存
+        state = self.__dict__.copy()
+        state["parallel"] = None
+        state["table"] = None
+        state["line_cache"] = {}
+        state["line_patterns"] = ({}, {})
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.tt_size_mb > 0:
+            self.table = TranspositionTable(self.tt_size_mb)
+
+    def close(self):
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+        if self.move_cache is not None:
+            self.move_cache.close()
+
+    def __parallelSearch(self, board, turn, depth, workers_board):
+        # 根节点的走法分给多个进程搜索，结果和__search相同，进程池不可用时使用__search
+        # workers_board是传给search的原始棋盘，工作进程从它开始搜索
+        score = self.evaluate(board, turn)
+        if abs(score) >= SCORE_FIVE:
+            return score
+        moves = self.genmove(board, turn)
+        if len(moves) == 0:
+            return score
+        if self.pv_move is not None:
+            for i in range(1, len(moves)):
+                if moves[i][1:] == self.pv_move:
+                    moves.insert(0, moves.pop(i))
+                    break
+        try:
+            if self.parallel is None:
+                self.parallel = ParallelRootSearch(self.len, self.workers, self.worker_kwargs, self.tt_size_mb)
+            score, index, counters = self.parallel.search(workers_board, turn, depth, moves)
+        except Exception as e:
+            logger.warning(f"Parallel search failed, search in one process: {e!r}")
+            self.close()
+            self.workers = 1
+            return self.__search(board, turn, depth)
+        self.nodes += 1 + counters[2]
+        self.alpha += len(moves) + counters[0]
+        self.belta += counters[1]
+        self.expanded += 1 + counters[3]
+        self.cutoffs += counters[4]
+        self.first_cutoffs += counters[5]
+        if index is None:
+            return SCORE_MIN
+        self.bestmove = moves[index][1:]
+        return score
+
+    def searchRootMoves(self, board, turn, depth, moves, root_alpha=None, update_root=None):
+        """
+        search the root moves of a parallel search in a worker process
+        :param moves: [(index, (score, x, y))] part of the root moves
+        :param root_alpha: root_alpha(index) -> alpha of the move, the best score found by all workers
+        :param update_root: update_root(index, score) is called when a move is better than its alpha
+        :return: best score, index of the best move, counters [alpha, belta, nodes, expanded, cutoffs, first_cutoffs]
+        """
+        self.prepareSearch(board, depth)
+        board = self.board
+        self.resetCounters()
+        self.nodes = 0
+        if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
+            op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
+        else:
+            op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+        alpha, best_score, best_index = SCORE_MIN, SCORE_MIN, None
+        try:
+            for index, (_, x, y) in moves:
+                cell = (y + PADDING) * self.width + x + PADDING
+                board[cell] = turn
+                self.updateSearchBoard(board, cell)
+                self.hash ^= self.zobrist_keys[turn][y * self.len + x]
+                if root_alpha is not None:
+                    alpha = max(root_alpha(index), SCORE_MIN)
+                score = - self.__search(board, op_turn, depth - 1, -SCORE_MAX, -alpha)
+                board[cell] = 0
+                self.updateSearchBoard(board, cell)
+                self.hash ^= self.zobrist_keys[turn][y * self.len + x]
+                self.belta += 1
+                if score > alpha:
+                    alpha = score
+                    best_index = index
+                    best_score = score
+                    if update_root is not None:
+                        update_root(index, score)
+        finally:
+            self.search_board = None
+        return best_score, best_index, [self.alpha, self.belta, self.nodes, self.expanded, self.cutoffs,
+                                        self.first_cutoffs]
+
+    def prepareSearch(self, board, depth):
+        # board复制到self.board上搜索，不会被修改
         self.maxdepth = depth
         self.bestmove = None
-        score = self.__search(board, turn, depth)
+        if self.pv_move is None:
+            # 迭代加深的后续迭代保留history分数
+            self.history.fill(0)
+        self.killers = [[None, None] for i in range(depth + 1)]
+        self.setSearchBoard(board)
+        self.hash = 0
+        for cell in np.flatnonzero(self.board == MAP_ENTRY_TYPE.MAP_PLAYER_ONE).tolist():
+            y, x = divmod(cell, self.width)
+            self.hash ^= self.zobrist_keys[MAP_ENTRY_TYPE.MAP_PLAYER_ONE][(y - PADDING) * self.len + x - PADDING]
+        for cell in np.flatnonzero(self.board == MAP_ENTRY_TYPE.MAP_PLAYER_TWO).tolist():
+            y, x = divmod(cell, self.width)
+            self.hash ^= self.zobrist_keys[MAP_ENTRY_TYPE.MAP_PLAYER_TWO][(y - PADDING) * self.len + x - PADDING]
+
+    def jitSearch(self, board, turn, depth):
+        # 编译的搜索不使用置换表和走法排序，结果和__search相同
+        self.maxdepth = depth
+        self.jit_params[3] = depth > 2
+        score, cell, stats = self.jit_search(self.getPaddedBoard(board), turn, depth, self.jit_steps,
+                                             self.jit_params, self.line_type_counts, self.line_record_masks)
+        self.nodes += stats[0]
+        self.alpha += stats[1]
+        self.belta += stats[2]
+        self.expanded += stats[3]
+        self.cutoffs += stats[4]
+        self.first_cutoffs += stats[5]
+        if cell < 0:
+            self.bestmove = 7, 7
+        else:
+            y, x = divmod(cell, self.width)
+            self.bestmove = x - PADDING, y - PADDING
+        x, y = self.bestmove
+        return score, x, y
+
+    def search(self, board, turn, depth=5):
+        if self.jit_search is not None and self.workers <= 1 and not self.limited and self.pv_move is None:
+            return self.jitSearch(board, turn, depth)
+        workers_board = board
+        self.prepareSearch(board, depth)
+        board = self.board
+        try:
+            if self.workers > 1 and depth > 1 and not self.limited:
+                score = self.__parallelSearch(board, turn, depth, workers_board)
+            elif self.pvs and self.pv_score is not None and abs(self.pv_score) < SCORE_FIVE:
+                # aspiration window: 以上一次迭代的分数为中心的窗口搜索，分数在窗口外时用完整窗口重新搜索
+                alpha, beta = self.pv_score - ASPIRATION_WINDOW, self.pv_score + ASPIRATION_WINDOW
+                score = self.__search(board, turn, depth, alpha, beta)
+                if score <= alpha or score >= beta:
+                    self.bestmove = None
+                    score = self.__search(board, turn, depth)
+            else:
+                score = self.__search(board, turn, depth)
+        finally:
+            self.search_board = None
         if self.bestmove is None:
             self.bestmove = 7, 7
         x, y = self.bestmove
         return score, x, y
 
+    def iterativeSearch(self, board, turn, depth=SEARCH_DEPTH, max_time=None, max_nodes=None):
+        # 迭代加深搜索，深度从1增加到depth，超出时间(秒)或节点数限制时中止，返回最深的完成的一次迭代的结果。
+        # 上一次迭代的最佳走法在根节点最先搜索，其它节点的最佳走法保存在置换表中，同样最先搜索。
+        # 深度为1的迭代总是会完成
+        self.nodes = 0
+        self.deadline = time.time() + max_time if max_time is not None else float("inf")
+        self.node_limit = max_nodes if max_nodes is not None else float("inf")
+        self.pv_move = None
+        self.pv_score = None
+        result = None
+        self.depth = 0
+        try:
+            for cur_depth in range(1, depth + 1):
+                self.limited = cur_depth > 1
+                try:
+                    result = self.search(board, turn, cur_depth)
+                except SearchAbort:
+                    break
+                self.depth = cur_depth
+                self.pv_move = result[1:]
+                self.pv_score = result[0]
+                if abs(result[0]) >= SCORE_FIVE:
+                    break
+        finally:
+            self.limited = False
+            self.pv_move = None
+            self.pv_score = None
+        return result
+
     def predict_step(self, chessboard: ChessBoard, first_random=True):  # findBestChess 函数是AI的入口函数。连动调用search和genmove
         if len(chessboard.steps) == 0 and first_random:
             return chessboard.get_random_first_step()
-        self.alpha = 0
-        self.belta = 0
-        board = np.array(chessboard.board)
-        board[chessboard.board == GAME_PLAYER.PLAYER_ONE] = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
-        board[chessboard.board == GAME_PLAYER.PLAYER_TWO] = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
-        if chessboard.current_player == GAME_PLAYER.PLAYER_ONE:
-            turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+        if self.opening_book is not None:
+            step = self.opening_book.probe(chessboard)
+            if step is not None:
+                return step
+        if self.threat_search is not None:
+            step = self.threat_search.solve(chessboard.board, chessboard.current_player)
+            if step is not None:
+                return step
+        self.resetCounters()
+        board, turn = to_search_board(chessboard)
+        if self.max_time is None and self.max_nodes is None:
+            # 固定深度搜索的结果只和局面有关，可以缓存
+            if self.move_cache is not None:
+                step = self.move_cache.get(chessboard, self.search_depth)
+                if step is not None:
+                    return step
+            score, x, y = self.search(board, turn, self.search_depth)
+            if self.move_cache is not None:
+                self.move_cache.put(chessboard, self.search_depth, (y, x))
         else:
-            turn = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
-        score, x, y = self.search(board.tolist(), turn, SEARCH_DEPTH)
+            score, x, y = self.iterativeSearch(board, turn, self.search_depth, self.max_time, self.max_nodes)
         return y, x
 
+    def resetCounters(self):
+        self.alpha = 0
+        self.belta = 0
+        self.expanded = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+    def getSearchStats(self):
+        # 上次resetCounters以来的搜索统计，cutoff_rate: 发生beta剪枝的节点比例，first_cutoff_rate: 剪枝中第一个走法就剪枝的比例
+        return {
+            "generated": self.alpha,
+            "searched": self.belta,
+            "expanded": self.expanded,
+            "cutoffs": self.cutoffs,
+            "cutoff_rate": self.cutoffs / max(self.expanded, 1),
+            "first_cutoff_rate": self.first_cutoffs / max(self.cutoffs, 1),
+        }
+
     def getPointScore(self, count):
         score = 0
         if count[FIVE] > 0:
@@ -200,6 +869,16 @@ class ChessAI():  # chessAI类
             score += count[STWO] * SCORE_STWO
         return score
 
+    def getPointScores(self, counts):
+        # getPointScore的批量版本，counts: [n, 8] 棋型个数
+        sfour, three = counts[:, SFOUR], counts[:, THREE]
+        scores = np.where((sfour > 1) | ((sfour > 0) & (three > 0)), sfour * SCORE_SFOUR,
+                          np.where(sfour > 0, SCORE_THREE, 0))
+        scores += np.where(three > 1, 5 * SCORE_THREE, np.where(three > 0, SCORE_THREE, 0))
+        scores += counts[:, STHREE] * SCORE_STHREE + counts[:, TWO] * SCORE_TWO + counts[:, STWO] * SCORE_STWO
+        scores = np.where(counts[:, FOUR] > 0, SCORE_FOUR, scores)
+        return np.where(counts[:, FIVE] > 0, SCORE_FIVE, scores)
+
     def getScore(self, mine_count, opponent_count):  # getScore函数就是对黑棋和白棋进行评分。
         mscore, oscore = 0, 0
         if mine_count[FIVE] > 0:
@@ -251,196 +930,144 @@ class ChessAI():  # chessAI类
         # 参数turn表示最近一手棋是谁下的，根据turn决定的mine（表示自己棋的值）
         # 和oppoent（表示对手棋的值，下一步棋由对手下），在对棋型评分时会用到。
         # checkWin 是游戏用来判断是否有一方获胜了。
-        self.reset()
         if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
             mine = 1
             opponent = 2
         else:
             mine = 2
             opponent = 1
-        for y in range(self.len):
-            for x in range(self.len):
-                if board[y][x] == mine:
-                    self.evaluatePoint(board, x, y, mine, opponent)
-                elif board[y][x] == opponent:
-                    self.evaluatePoint(board, x, y, opponent, mine)
-        mine_count = self.count[mine - 1]
-        opponent_count = self.count[opponent - 1]
+        if board is self.search_board:
+            # 搜索中的棋盘，使用增量统计的棋型个数
+            mine_count = self.total_count[mine - 1].tolist()
+            if checkWin:
+                return mine_count[FIVE] > 0
+            mscore, oscore = self.getScore(mine_count, self.total_count[opponent - 1].tolist())
+            return mscore - oscore
+        board = self.getPaddedBoard(board)
+        self.reset()
+        # 按行扫描所有棋子
+        for cell in np.flatnonzero((board == mine) | (board == opponent)).tolist():
+            if board[cell] == mine:
+                self.evaluatePoint(board, cell, mine, opponent)
+            else:
+                self.evaluatePoint(board, cell, opponent, mine)
+        mine_count = self.count[mine - 1].tolist()
+        opponent_count = self.count[opponent - 1].tolist()
         if checkWin:
             return mine_count[FIVE] > 0
         else:
             mscore, oscore = self.getScore(mine_count, opponent_count)
             return mscore - oscore
 
-    def evaluatePoint(self, board, x, y, mine, opponent, count=None):  # evaluatePoint函数是对于一个位置的四个方向分别进行检查。
-        dir_offset = [(1, 0), (0, 1), (1, 1), (1, -1)]
+    def evaluatePoint(self, board, cell, mine, opponent, count=None):  # evaluatePoint函数是对于一个位置的四个方向分别进行检查。
         ignore_record = True
         if count is None:
             count = self.count[mine - 1]
             ignore_record = False
         for i in range(4):
-            if self.record[y][x][i] == 0 or ignore_record:
-                self.analysisLine(board, x, y, i, dir_offset[i], mine, opponent, count)
-
-    def getLine(self, board, x, y, dir_offset, mine, opponent):  # getLine函数，根据棋子的位置和方向，
-        # 获取上面说的长度为9的线。有个取巧的地方，如果线上的位置超出了棋盘范围，
-        # 就将这个位置的值设为对手的值，因为超出范围和被对手棋挡着，对棋型判断的结果是一样的
-        line = [0 for i in range(9)]
-        tmp_x = x + (-5 * dir_offset[0])
-        tmp_y = y + (-5 * dir_offset[1])
-        for i in range(9):
-            tmp_x += dir_offset[0]
-            tmp_y += dir_offset[1]
-            if (tmp_x < 0 or tmp_x >= self.len or
-                    tmp_y < 0 or tmp_y >= self.len):
-                line[i] = opponent  # set out of range as opponent chess
-            else:
-                line[i] = board[tmp_y][tmp_x]
-        return line
-
-    def analysisLine(self, board, x, y, dir_index, dir, mine, opponent, count):  # analysisLine函数
-        # 是判断一条线上自己棋能形成棋型的代码， mine表示自己棋的值，opponent表示对手棋的值。
-        # 要根据中心点相邻己方棋子能连成的个数来分别判断，己方棋值设为M，对方棋值设为P，空点值设为X。
-        def setRecord(self, x, y, left, right, dir_index, dir_offset):  # setRecord函数 标记已经检测过，需要跳过的棋子。
-            tmp_x = x + (-5 + left) * dir_offset[0]
-            tmp_y = y + (-5 + left) * dir_offset[1]
-            for i in range(left, right + 1):
-                tmp_x += dir_offset[0]
-                tmp_y += dir_offset[1]
-                self.record[tmp_y][tmp_x][dir_index] = 1
-
-        empty = MAP_ENTRY_TYPE.MAP_EMPTY
-        left_idx, right_idx = 4, 4
-        line = self.getLine(board, x, y, dir, mine, opponent)
-        while right_idx < 8:
-            if line[right_idx + 1] != mine:
-                break
-            right_idx += 1
-        while left_idx > 0:
-            if line[left_idx - 1] != mine:
-                break
-            left_idx -= 1
-        left_range, right_range = left_idx, right_idx
-        while right_range < 8:
-            if line[right_range + 1] == opponent:
-                break
-            right_range += 1
-        while left_range > 0:
-            if line[left_range - 1] == opponent:
-                break
-            left_range -= 1
-        chess_range = right_range - left_range + 1
-        if chess_range < 5:
-            setRecord(self, x, y, left_range, right_range, dir_index, dir)
-            return CHESS_TYPE.NONE
-        setRecord(self, x, y, left_idx, right_idx, dir_index, dir)
-        m_range = right_idx - left_idx + 1
-        # M:自己的棋子, P:对手的棋子或者超出范围, X: 空
-        if m_range >= 5:
-            count[FIVE] += 1
-        # 活四的形式 : XMMMMX
-        # 冲四的形式 : XMMMMP, PMMMMX
-        if m_range == 4:
-            left_empty = right_empty = False
-            if line[left_idx - 1] == empty:
-                left_empty = True
-            if line[right_idx + 1] == empty:
-                right_empty = True
-            if left_empty and right_empty:
-                count[FOUR] += 1
-            elif left_empty or right_empty:
-                count[SFOUR] += 1
-        # 冲四 : MXMMM, MMMXM
-        # 活三 : XMMMXX, XXMMMX
-        # 眠三 : PMMMX, XMMMP, PXMMMXP
-        if m_range == 3:
-            left_empty = right_empty = False
-            left_four = right_four = False
-            if line[left_idx - 1] == empty:
-                if line[left_idx - 2] == mine:  # MXMMM
-                    setRecord(self, x, y, left_idx - 2, left_idx - 1, dir_index, dir)
-                    count[SFOUR] += 1
-                    left_four = True
-                left_empty = True
-            if line[right_idx + 1] == empty:
-                if line[right_idx + 2] == mine:  # MMMXM
-                    setRecord(self, x, y, right_idx + 1, right_idx + 2, dir_index, dir)
-                    count[SFOUR] += 1
-                    right_four = True
-                right_empty = True
-
-            if left_four or right_four:
-                pass
-            elif left_empty and right_empty:
-                if chess_range > 5:  # XMMMXX, XXMMMX
-                    count[THREE] += 1
-                else:  # PXMMMXP
-                    count[STHREE] += 1
-            elif left_empty or right_empty:  # PMMMX, XMMMP
-                count[STHREE] += 1
-        # 冲四: MMXMM
-        # 活三: XMXMMX, XMMXMX
-        # 眠三: PMXMMX, XMXMMP, PMMXMX, XMMXMP
-        # 活二: XMMX
-        # 眠二: PMMX, XMMP
-        if m_range == 2:
-            left_empty = right_empty = False
-            left_three = right_three = False
-            if line[left_idx - 1] == empty:
-                if line[left_idx - 2] == mine:
-                    setRecord(self, x, y, left_idx - 2, left_idx - 1, dir_index, dir)
-                    if line[left_idx - 3] == empty:
-                        if line[right_idx + 1] == empty:  # XMXMMX
-                            count[THREE] += 1
-                        else:  # XMXMMP
-                            count[STHREE] += 1
-                        left_three = True
-                    elif line[left_idx - 3] == opponent:  # PMXMMX
-                        if line[right_idx + 1] == empty:
-                            count[STHREE] += 1
-                            left_three = True
-                left_empty = True
-            if line[right_idx + 1] == empty:
-                if line[right_idx + 2] == mine:
-                    if line[right_idx + 3] == mine:  # MMXMM
-                        setRecord(self, x, y, right_idx + 1, right_idx + 2, dir_index, dir)
-                        count[SFOUR] += 1
-                        right_three = True
-                    elif line[right_idx + 3] == empty:
-                        if left_empty:  # XMMXMX
-                            count[THREE] += 1
-                        else:  # PMMXMX
-                            count[STHREE] += 1
-                        right_three = True
-                    elif left_empty:  # XMMXMP
-                        count[STHREE] += 1
-                        right_three = True
-                right_empty = True
-            if left_three or right_three:
-                pass
-            elif left_empty and right_empty:  # XMMX
-                count[TWO] += 1
-            elif left_empty or right_empty:  # PMMX, XMMP
-                count[STWO] += 1
-        # 活二: XMXMX, XMXXMX only check right direction
-        # 眠二: PMXMX, XMXMP
-        if m_range == 1:
-            left_empty = right_empty = False
-            if line[left_idx - 1] == empty:
-                if line[left_idx - 2] == mine:
-                    if line[left_idx - 3] == empty:
-                        if line[right_idx + 1] == opponent:  # XMXMP
-                            count[STWO] += 1
-                left_empty = True
-
-            if line[right_idx + 1] == empty:
-                if line[right_idx + 2] == mine:
-                    if line[right_idx + 3] == empty:
-                        if left_empty:  # XMXMX
-                            count[TWO] += 1
-                        else:  # PMXMX
-                            count[STWO] += 1
-                elif line[right_idx + 2] == empty:
-                    if line[right_idx + 3] == mine and line[right_idx + 4] == empty:  # XMXXMX
-                        count[TWO] += 1
-        return CHESS_TYPE.NONE
\ No newline at end of file
+            if ignore_record or self.record[cell, i] == 0:
+                self.analysisLine(board, cell, i, mine, count, ignore_record)
+
+    def getLine(self, board, cell, step):  # getLine函数，根据棋子的位置和方向，
+        # 获取上面说的长度为9的线。棋盘四周填充了MAP_NONE，超出范围和被对手棋挡着，对棋型判断的结果是一样的，
+        # getLinePattern把MAP_NONE当作对手的棋，不用检查边界
+        return board[cell - 4 * step:cell + 5 * step:step].tobytes()
+
+    def getLinePattern(self, line, mine):
+        # getLine得到的线 -> (棋型, 需要标记的位置)，在线的base-3编码表中查出后缓存
+        patterns = self.line_patterns[mine - 1]
+        pattern = patterns.get(line)
+        if pattern is None:
+            code = 0
+            for value, weight in zip(line, LINE_CODE_WEIGHTS):
+                if value == mine:
+                    code += weight
+                elif value != MAP_ENTRY_TYPE.MAP_EMPTY:
+                    code += 2 * weight
+            pattern = patterns[line] = self.line_table[code]
+        return pattern
+
+    def setSearchBoard(self, board):
+        # 把board复制到self.board，从头统计所有线的棋型个数和候选点，之后self.board上的落子和提子都要调用updateSearchBoard
+        self.board.reshape(self.width, self.width)[PADDING:-PADDING, PADDING:-PADDING] = board
+        self.search_board = self.board
+        self.total_count.fill(0)
+        for line_id in range(len(self.lines)):
+            self.line_counts[line_id] = self.empty_counts
+            self.updateLine(self.board, line_id)
+        neighbor_num = self.getNeighborNum(self.board)
+        self.neighbor_num = neighbor_num.tolist()
+        self.frontier = set(np.flatnonzero((self.board == MAP_ENTRY_TYPE.MAP_EMPTY) & (neighbor_num > 0)).tolist())
+        self.point_valid.fill(False)
+
+    def updateSearchBoard(self, board, cell):
+        for line_id in self.cell_lines[cell]:
+            self.updateLine(board, line_id)
+        self.updateFrontier(cell, 1 if board[cell] != 0 else -1)
+        # 只有同一条线上距离4以内的点的得分会变化
+        self.point_valid[cell + self.point_offsets] = False
+
+    def updateFrontier(self, cell, delta):
+        # delta为1表示cell落子，-1表示提子，neighbor_num在0和1之间变化的点加入或移出frontier
+        neighbor_num = self.neighbor_num
+        frontier = self.frontier
+        if delta > 0:
+            frontier.discard(cell)
+            board = self.search_board
+            for offset in self.neighbor_offsets:
+                neighbor = cell + offset
+                neighbor_num[neighbor] += 1
+                if neighbor_num[neighbor] == 1 and board[neighbor] == 0:
+                    frontier.add(neighbor)
+        else:
+            for offset in self.neighbor_offsets:
+                neighbor = cell + offset
+                neighbor_num[neighbor] -= 1
+                if neighbor_num[neighbor] == 0:
+                    frontier.discard(neighbor)
+            if neighbor_num[cell] > 0:
+                frontier.add(cell)
+
+    def updateLine(self, board, line_id):
+        values = board[self.lines[line_id]].tobytes()
+        key = (self.line_dirs[line_id], values)
+        counts = self.line_cache.get(key)
+        if counts is None:
+            if len(self.line_cache) >= LINE_CACHE_SIZE:
+                self.line_cache.clear()
+            counts = self.analysisFullLine(values, self.line_dirs[line_id] == 3)
+            self.line_cache[key] = counts
+        old_counts = self.line_counts[line_id]
+        if old_counts is not counts:
+            self.total_count += counts
+            self.total_count -= old_counts
+            self.line_counts[line_id] = counts
+
+    def analysisFullLine(self, values, reverse):
+        # 和evaluate相同的顺序分析一条完整的线上的所有棋子，返回双方的棋型个数
+        # evaluate按行扫描棋盘，(1, -1)方向的线上是从后向前访问的
+        counts = ([0] * 8, [0] * 8)
+        record = [0] * len(values)
+        padding = bytes([MAP_ENTRY_TYPE.MAP_NONE]) * 4
+        line = padding + values + padding
+        for pos in (range(len(values) - 1, -1, -1) if reverse else range(len(values))):
+            mine = values[pos]
+            if mine == MAP_ENTRY_TYPE.MAP_EMPTY or record[pos]:
+                continue
+            chess_types, records = self.getLinePattern(line[pos:pos + 9], mine)
+            for i in records:
+                record[pos + i - 4] = 1
+            for chess_type in chess_types:
+                counts[mine - 1][chess_type] += 1
+        return np.array(counts, dtype=np.int32)
+
+    def analysisLine(self, board, cell, dir_index, mine, count, ignore_record=False):  # analysisLine函数
+        # 是判断一条线上自己棋能形成棋型的代码，棋型和需要标记的位置从预先计算的表中查出，见analysis_line
+        step = self.dir_steps[dir_index]
+        chess_types, records = self.getLinePattern(self.getLine(board, cell, step), mine)
+        if not ignore_record:
+            for i in records:
+                self.record[cell + (i - 4) * step, dir_index] = 1
+        for chess_type in chess_types:
+            count[chess_type] += 1
+        return CHESS_TYPE.NONE
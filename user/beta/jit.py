@@ -0,0 +1,235 @@
+from user.beta.agent import MAP_ENTRY_TYPE, FIVE, FOUR, THREE, TWO, SFOUR, STHREE, STWO, SCORE_MAX, SCORE_MIN, \
+    SCORE_FIVE, SCORE_FOUR, SCORE_SFOUR, SCORE_THREE, SCORE_STHREE, SCORE_TWO, SCORE_STWO, LIMITED_MOVE_NUM
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # 没有安装numba时是普通的python函数，ChessAI不会使用它们
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# ChessAI固定深度搜索的编译版本，和ChessAI.search的结果(分数和走法)相同。
+# 棋盘是ChessAI.getPaddedBoard的一维填充棋盘，位置用一维下标cell表示。
+# params: [width, padding, radius, limited]，limited为1时genmove只保留前LIMITED_MOVE_NUM个走法
+# stats: [nodes, generated, searched, expanded, cutoffs, first_cutoffs]
+EMPTY = int(MAP_ENTRY_TYPE.MAP_EMPTY)
+
+
+@njit(cache=True)
+def get_line(board, cell, step, mine):
+    # getLine的长度为9的线的base-3编码: 空为0，自己为1，对手或填充的格子为2
+    code = 0
+    weight = 1
+    for i in range(-4, 5):
+        value = board[cell + i * step]
+        if value == mine:
+            code += weight
+        elif value != EMPTY:
+            code += 2 * weight
+        weight *= 3
+    return code
+
+
+@njit(cache=True)
+def analysis_line(board, cell, dir_index, step, mine, count, record, type_counts, record_masks):
+    # ChessAI.analysisLine
+    code = get_line(board, cell, step, mine)
+    mask = record_masks[code]
+    for i in range(9):
+        if mask >> i & 1:
+            record[cell + (i - 4) * step, dir_index] = 1
+    for chess_type in range(8):
+        count[chess_type] += type_counts[code, chess_type]
+
+
+@njit(cache=True)
+def get_score(mine_count, opponent_count):
+    # ChessAI.getScore，会修改mine_count和opponent_count
+    mscore, oscore = 0, 0
+    if mine_count[FIVE] > 0:
+        return SCORE_FIVE, 0
+    if opponent_count[FIVE] > 0:
+        return 0, SCORE_FIVE
+    if mine_count[SFOUR] >= 2:
+        mine_count[FOUR] += 1
+    if opponent_count[SFOUR] >= 2:
+        opponent_count[FOUR] += 1
+    if mine_count[FOUR] > 0:
+        return 9050, 0
+    if mine_count[SFOUR] > 0:
+        return 9040, 0
+    if opponent_count[FOUR] > 0:
+        return 0, 9030
+    if opponent_count[SFOUR] > 0 and opponent_count[THREE] > 0:
+        return 0, 9020
+    if mine_count[THREE] > 0 and opponent_count[SFOUR] == 0:
+        return 9010, 0
+    if opponent_count[THREE] > 1 and mine_count[THREE] == 0 and mine_count[STHREE] == 0:
+        return 0, 9000
+    if opponent_count[SFOUR] > 0:
+        oscore += 400
+    if mine_count[THREE] > 1:
+        mscore += 500
+    elif mine_count[THREE] > 0:
+        mscore += 100
+    if opponent_count[THREE] > 1:
+        oscore += 2000
+    elif opponent_count[THREE] > 0:
+        oscore += 400
+    mscore += mine_count[STHREE] * 10 + mine_count[TWO] * 6 + mine_count[STWO] * 2
+    oscore += opponent_count[STHREE] * 10 + opponent_count[TWO] * 6 + opponent_count[STWO] * 2
+    return mscore, oscore
+
+
+@njit(cache=True)
+def evaluate(board, turn, steps, params, count, record, type_counts, record_masks):
+    # ChessAI.evaluate: 按行扫描所有棋子，返回turn一方的分数
+    width, padding = params[0], params[1]
+    mine, opponent = turn, 3 - turn
+    count[:] = 0
+    record[:] = 0
+    for cell in range(padding * width, (width - padding) * width):
+        value = board[cell]
+        if value != mine and value != opponent:
+            continue
+        for i in range(4):
+            if record[cell, i] == 0:
+                analysis_line(board, cell, i, steps[i], value, count[value - 1], record, type_counts, record_masks)
+    mscore, oscore = get_score(count[mine - 1], count[opponent - 1])
+    return mscore - oscore
+
+
+@njit(cache=True)
+def get_point_score(board, cell, steps, mine, type_counts):
+    # ChessAI.getPointScore: mine下在空点cell上时四个方向的棋型的得分
+    count = np.zeros(8, dtype=np.int32)
+    for i in range(4):
+        code = get_line(board, cell, steps[i], mine) + 81  # 中心为自己的棋
+        for chess_type in range(8):
+            count[chess_type] += type_counts[code, chess_type]
+    if count[FIVE] > 0:
+        return SCORE_FIVE
+    if count[FOUR] > 0:
+        return SCORE_FOUR
+    score = 0
+    if count[SFOUR] > 1 or (count[SFOUR] > 0 and count[THREE] > 0):
+        score += count[SFOUR] * SCORE_SFOUR
+    elif count[SFOUR] > 0:
+        score += SCORE_THREE
+    if count[THREE] > 1:
+        score += 5 * SCORE_THREE
+    elif count[THREE] > 0:
+        score += SCORE_THREE
+    return score + count[STHREE] * SCORE_STHREE + count[TWO] * SCORE_TWO + count[STWO] * SCORE_STWO
+
+
+@njit(cache=True)
+def genmove(board, turn, steps, params, type_counts):
+    # ChessAI.genmove，返回按搜索顺序排列的cell
+    width, padding, radius, limited = params[0], params[1], params[2], params[3]
+    mine, opponent = turn, 3 - turn
+    size = width * width
+    cells = np.empty(size, dtype=np.int64)
+    mscores = np.empty(size, dtype=np.int64)
+    oscores = np.empty(size, dtype=np.int64)
+    n = 0
+    for cell in range(padding * width, (width - padding) * width):
+        if board[cell] != EMPTY:
+            continue
+        neighbor = False
+        for i in range(-radius, radius + 1):
+            for j in range(-radius, radius + 1):
+                value = board[cell + i * width + j]
+                if value == mine or value == opponent:
+                    neighbor = True
+        if neighbor:
+            cells[n] = cell
+            mscores[n] = get_point_score(board, cell, steps, mine, type_counts)
+            oscores[n] = get_point_score(board, cell, steps, opponent, type_counts)
+            n += 1
+    # 和genmove相同的分组: 连五、自己的活四、对手的活四(加上自己的冲四)
+    keys = np.empty(n, dtype=np.int64)
+    num = 0
+    for group in range(4):
+        for k in range(n):
+            mscore, oscore = mscores[k], oscores[k]
+            five = mscore >= SCORE_FIVE or oscore >= SCORE_FIVE
+            if group == 0:
+                selected = five
+            elif group == 1:
+                selected = not five and mscore >= SCORE_FOUR
+            elif group == 2:
+                selected = not five and mscore < SCORE_FOUR and oscore >= SCORE_FOUR
+            else:
+                selected = not five and mscore < SCORE_FOUR and oscore < SCORE_FOUR and mscore >= SCORE_SFOUR
+            if selected:
+                keys[num] = cells[k]
+                num += 1
+        if num > 0 and group < 2:
+            return keys[:num]
+        if group == 2 and num == 0:
+            break
+    if num > 0:
+        return keys[:num]
+    # 其余按(分数, x, y)从大到小排序
+    for k in range(n):
+        y, x = cells[k] // width, cells[k] % width
+        keys[k] = (max(mscores[k], oscores[k]) << 16) | (x << 8) | y
+    keys = np.sort(keys)[::-1]
+    if limited and n > LIMITED_MOVE_NUM:
+        keys = keys[:LIMITED_MOVE_NUM]
+    moves = np.empty(len(keys), dtype=np.int64)
+    for k in range(len(keys)):
+        moves[k] = (keys[k] & 0xff) * width + (keys[k] >> 8 & 0xff)
+    return moves
+
+
+@njit(cache=True)
+def search(board, turn, depth, alpha, beta, maxdepth, steps, params, count, record, type_counts, record_masks,
+           stats, best):
+    # ChessAI.__search的alpha-beta搜索，根节点的最佳走法保存在best[0]中
+    stats[0] += 1
+    score = evaluate(board, turn, steps, params, count, record, type_counts, record_masks)
+    if depth <= 0 or abs(score) >= SCORE_FIVE:
+        return score
+    moves = genmove(board, turn, steps, params, type_counts)
+    stats[1] += len(moves)
+    if len(moves) == 0:
+        return score
+    stats[3] += 1
+    for i in range(len(moves)):
+        cell = moves[i]
+        board[cell] = turn
+        score = - search(board, 3 - turn, depth - 1, -beta, -alpha, maxdepth, steps, params, count, record,
+                         type_counts, record_masks, stats, best)
+        board[cell] = EMPTY
+        stats[2] += 1
+        if score > alpha:
+            alpha = score
+            if depth == maxdepth:
+                best[0] = cell
+            if alpha >= beta:
+                stats[4] += 1
+                if i == 0:
+                    stats[5] += 1
+                break
+    return alpha
+
+
+def search_root(board, turn, depth, steps, params, type_counts, record_masks):
+    """
+    :param board: 一维填充棋盘，搜索后不变
+    :return: score, cell of the best move (-1 if no move is better than SCORE_MIN), stats
+    """
+    count = np.zeros((2, 8), dtype=np.int32)
+    record = np.zeros((len(board), 4), dtype=np.uint8)
+    stats = np.zeros(6, dtype=np.int64)
+    best = np.full(1, -1, dtype=np.int64)
+    score = search(board, int(turn), depth, SCORE_MIN, SCORE_MAX, depth, steps, params, count, record,
+                   type_counts, record_masks, stats, best)
+    return int(score), int(best[0]), stats.tolist()
@@ -0,0 +1,138 @@
+from game.base_board import ChessBoard
+from game.zobrist import get_symmetry_maps, get_inverse_symmetry_maps
+from collections import OrderedDict
+from multiprocessing import util
+from typing import Optional, Tuple
+import os
+import sqlite3
+import time
+
+
+class MoveCache(object):
+    """
+    Position -> move cache of a deterministic engine, keyed by (ChessBoard.canonical_hash, depth, version). The move
+    is stored in the frame of the canonical symmetry, so rotations and flips of a position share one entry.
+    The recent entries are kept in an in-memory LRU, all entries are stored in a SQLite file (WAL mode), which can be
+    read and written by many processes at the same time. Every process opens its own connection. The puts are
+    queued in memory and written in one short transaction per batch, so the write lock is never held while the engine
+    searches. The last batch is written by close, or when the process exits.
+    """
+    def __init__(self, row: int, col: int, cache_file: Optional[str] = None, version: str = "",
+                 max_size: int = 1 << 16, commit_size: int = 64, commit_interval: float = 10.):
+        """
+        :param cache_file: SQLite file, only the in-memory LRU is used if it is None
+        :param version: part of the key, change it when the engine gives different moves
+        :param max_size: max entries of the in-memory LRU
+        :param commit_size: write the queued puts when so many are queued
+        :param commit_interval: or so many seconds after the last write
+        """
+        self.row = row
+        self.col = col
+        self.cache_file = cache_file
+        self.version = version
+        self.max_size = max_size
+        self.commit_size = commit_size
+        self.commit_interval = commit_interval
+        self.maps = get_symmetry_maps(row, col)
+        self.inverse_maps = get_inverse_symmetry_maps(row, col)
+        self.memory = OrderedDict()
+        self.connection = None
+        self._finalizer = None
+        # (hash, depth, version, move) of the puts not written to the file
+        self.pending = []
+        self.last_commit = time.time()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # 复制到其它进程时不带连接和内存中的缓存
+        state = self.__dict__.copy()
+        state["memory"] = OrderedDict()
+        state["connection"] = None
+        state["_finalizer"] = None
+        state["pending"] = []
+        return state
+
+    def get_connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            if os.path.dirname(self.cache_file) and not os.path.exists(os.path.dirname(self.cache_file)):
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            self.connection = sqlite3.connect(self.cache_file, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS moves (hash INTEGER, depth INTEGER, version TEXT, "
+                                    "move INTEGER, PRIMARY KEY (hash, depth, version)) WITHOUT ROWID")
+            self.connection.commit()
+            # 进程池的工作进程退出时不执行atexit，multiprocessing的Finalize在进程退出时也会执行
+            self._finalizer = util.Finalize(self, self._close, args=(self.connection, self.pending), exitpriority=0)
+        return self.connection
+
+    @staticmethod
+    def _write(connection: sqlite3.Connection, pending: list):
+        if pending:
+            with connection:
+                connection.executemany("INSERT OR IGNORE INTO moves VALUES (?, ?, ?, ?)", pending)
+            pending.clear()
+
+    @staticmethod
+    def _close(connection: sqlite3.Connection, pending: list):
+        MoveCache._write(connection, pending)
+        connection.close()
+
+    def flush(self):
+        """
+        write the queued puts to the file
+        """
+        if self.connection is not None:
+            self._write(self.connection, self.pending)
+        self.last_commit = time.time()
+
+    def close(self):
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self.connection = None
+
+    def get(self, chessboard: ChessBoard, depth: int) -> Optional[Tuple[int, int]]:
+        """
+        :return: (r, c) cached move of the current player, None if the position is not cached
+        """
+        key, symmetry = chessboard.get_canonical_symmetry()
+        move = self.memory.get((key, depth))
+        if move is not None:
+            self.memory.move_to_end((key, depth))
+        elif self.cache_file is not None:
+            # sqlite的INTEGER是有符号64位整数
+            row = self.get_connection().execute(
+                "SELECT move FROM moves WHERE hash = ? AND depth = ? AND version = ?",
+                (key - (1 << 64) if key >= 1 << 63 else key, depth, self.version)).fetchone()
+            if row is not None:
+                move = row[0]
+                self.remember(key, depth, move)
+        if move is None:
+            self.misses += 1
+            return None
+        r, c = divmod(self.inverse_maps[symmetry][move], self.col)
+        if not chessboard.is_empty(r, c):
+            # hash冲突
+            self.misses += 1
+            return None
+        self.hits += 1
+        return r, c
+
+    def put(self, chessboard: ChessBoard, depth: int, step: Tuple[int, int]):
+        key, symmetry = chessboard.get_canonical_symmetry()
+        move = self.maps[symmetry][step[0] * self.col + step[1]]
+        self.remember(key, depth, move)
+        if self.cache_file is not None:
+            # 打开连接时注册退出时的写入
+            self.get_connection()
+            self.pending.append((key - (1 << 64) if key >= 1 << 63 else key, depth, self.version, move))
+            if len(self.pending) >= self.commit_size or time.time() - self.last_commit >= self.commit_interval:
+                self.flush()
+
+    def remember(self, key: int, depth: int, move: int):
+        self.memory[(key, depth)] = move
+        self.memory.move_to_end((key, depth))
+        if len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
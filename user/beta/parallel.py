@@ -0,0 +1,110 @@
+from user.beta.transposition import TranspositionTable
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import List, Optional, Tuple
+import numpy as np
+import weakref
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+_worker_ai = None
+_worker_memory = None
+_root_best = None
+NO_INDEX = 1 << 30
+
+
+def _init_worker(chess_len: int, ai_kwargs: dict, memory_name: Optional[str], entry_num: int, root_best):
+    global _worker_ai, _worker_memory, _root_best
+    from user.beta.agent import ChessAI
+    _worker_ai = ChessAI(chess_len, **ai_kwargs)
+    _root_best = root_best
+    if memory_name is not None:
+        _worker_memory = shared_memory.SharedMemory(name=memory_name)
+        buffer = _worker_memory.buf
+        _worker_ai.table = TranspositionTable(keys=np.ndarray((entry_num,), dtype=np.uint64, buffer=buffer),
+                                              data=np.ndarray((entry_num,), dtype=np.uint64, buffer=buffer,
+                                                              offset=entry_num * 8))
+
+
+def _root_alpha(index: int) -> int:
+    # 只有比当前最佳分数高，或者分数相同但是排在前面的走法才可能是最佳走法，分数和下标在锁内一起读取
+    with _root_best.get_lock():
+        score, best_index = _root_best[0], _root_best[1]
+    if best_index == NO_INDEX:
+        return score
+    return score - 1 if index < best_index else score
+
+
+def _update_root(index: int, score: int):
+    with _root_best.get_lock():
+        if score > _root_best[0] or (score == _root_best[0] and index < _root_best[1]):
+            _root_best[0], _root_best[1] = score, index
+
+
+def _search_root_moves(board, turn, depth, moves):
+    return _worker_ai.searchRootMoves(board, turn, depth, moves, _root_alpha, _update_root)
+
+
+class ParallelRootSearch(object):
+    """
+    Root split search in a process pool: the root moves are dealt to the workers in turn, every worker searches its
+    moves one by one. The best root score and move found so far are shared, a move is searched with a window which
+    only proves it if it is better, or equal but earlier in the move order. The workers share one transposition
+    table in shared memory when multiprocessing.shared_memory exists, otherwise every worker has its own table.
+    The result is the same as the single process search: the best score, and the first root move with it.
+    """
+    def __init__(self, chess_len: int, workers: int, ai_kwargs: dict, tt_size_mb: float = 16):
+        """
+        :param ai_kwargs: ChessAI arguments of the workers
+        """
+        self.workers = workers
+        self.memory = None
+        memory_name, entry_num = None, 0
+        ai_kwargs = dict(ai_kwargs)
+        if shared_memory is not None and tt_size_mb > 0:
+            entry_num = TranspositionTable.get_entry_num(tt_size_mb)
+            # 新建的共享内存全为0，即空的置换表
+            self.memory = shared_memory.SharedMemory(create=True, size=entry_num * 16)
+            memory_name = self.memory.name
+            ai_kwargs["tt_size_mb"] = 0
+        else:
+            ai_kwargs["tt_size_mb"] = tt_size_mb
+        self.root_best = multiprocessing.Array("q", 2)
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(chess_len, ai_kwargs, memory_name, entry_num, self.root_best))
+        self._finalizer = weakref.finalize(self, self._close, self.executor, self.memory)
+
+    @staticmethod
+    def _close(executor, memory):
+        executor.shutdown(wait=True)
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+
+    def close(self):
+        self._finalizer()
+
+    def search(self, board, turn, depth, moves) -> Tuple[int, Optional[int], List[int]]:
+        """
+        :param moves: root moves (score, x, y) in search order
+        :return: best score, index of the best move (None if no move is better than SCORE_MIN), counters of the
+        workers: [alpha, belta, nodes, expanded, cutoffs, first_cutoffs]
+        """
+        from user.beta.agent import SCORE_MIN
+        self.root_best[0], self.root_best[1] = SCORE_MIN, NO_INDEX
+        indexed_moves = list(enumerate(moves))
+        futures = [self.executor.submit(_search_root_moves, board, turn, depth, indexed_moves[i::self.workers])
+                   for i in range(min(self.workers, len(moves)))]
+        best_score, best_index = None, None
+        counters = [0] * 6
+        for future in futures:
+            score, index, worker_counters = future.result()
+            counters = [a + b for a, b in zip(counters, worker_counters)]
+            if index is None:
+                continue
+            if best_index is None or score > best_score or (score == best_score and index < best_index):
+                best_score, best_index = score, index
+        return best_score, best_index, counters
@@ -0,0 +1,66 @@
+import numpy as np
+from typing import Optional, Tuple
+
+# xor into the position hash, the same stones with different side to move or move limit are different nodes
+TURN_KEY = 0x9d39247e33776d41
+LIMITED_KEY = 0x2af7398005aaa5c7
+
+
+class TranspositionTable(object):
+    """
+    Fixed size hash table of search results. Each bucket has two entries, the first one keeps the deepest search and
+    the second one is always replaced. An entry stores key ^ data beside data, so an entry written by another process
+    at the same time never matches a wrong key.
+    data: score + 2 ** 31 (32 bits) | depth (8 bits) | flag (2 bits) | move + 1 (16 bits, 0 for no move)
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+    ENTRY_BYTES = 16
+
+    def __init__(self, size_mb: float = 16, keys: Optional[np.ndarray] = None, data: Optional[np.ndarray] = None):
+        """
+        :param size_mb: memory cap of the table
+        :param keys, data: use existing arrays (e.g. in shared memory) instead of allocating new ones
+        """
+        if keys is None:
+            keys = np.zeros(self.get_entry_num(size_mb), dtype=np.uint64)
+            data = np.zeros(self.get_entry_num(size_mb), dtype=np.uint64)
+        self.keys = keys
+        self.data = data
+        self.mask = len(keys) // 2 - 1
+
+    @classmethod
+    def get_entry_num(cls, size_mb: float) -> int:
+        # 桶数是2的幂，总大小不超过size_mb
+        bucket_num = 1
+        while bucket_num * 4 * cls.ENTRY_BYTES <= size_mb * 2 ** 20:
+            bucket_num *= 2
+        return 2 * bucket_num
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys.fill(0)
+        self.data.fill(0)
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[int]]]:
+        """
+        :return: depth, flag, score, move of the position, None if it is not in the table
+        """
+        index = (key & self.mask) << 1
+        for i in (index, index + 1):
+            data = int(self.data[i])
+            if data and int(self.keys[i]) ^ data == key:
+                move = (data >> 42) & 0xffff
+                return (data >> 32) & 0xff, (data >> 40) & 0x3, (data & 0xffffffff) - 2 ** 31, \
+                    move - 1 if move else None
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: Optional[int]):
+        data = (score + 2 ** 31) | (depth << 32) | (flag << 40) | ((0 if move is None else move + 1) << 42)
+        index = (key & self.mask) << 1
+        old = int(self.data[index])
+        if old and int(self.keys[index]) ^ old != key and (old >> 32) & 0xff > depth:
+            index += 1
+        self.keys[index] = key ^ data
+        self.data[index] = data
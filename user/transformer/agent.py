@@ -1,20 +1,28 @@
 from game.base_board import ChessBoard
+from game.threat_space import ThreatSpaceSearch
+from game.opening_book import OpeningBook
 from user.transformer.net import Transformer
+from user.transformer.batcher import InferenceBatcher
+from user.transformer.checkpoint import load_checkpoint, save_checkpoint
 from torch import Tensor
 from loguru import logger
 import torch
-import numpy as np
 import os
 from user.random.rand import Rand
 import random
 
 
 class Transformer_Gobang(object):
-    def __init__(self, chess_row, chess_col, model_file, train=True):
+    def __init__(self, chess_row, chess_col, model_file, train=True, threat_search=False, opening_book=None):
+        """
+        :param threat_search: with rule, predict_step plays the VCF/VCT win found by ThreatSpaceSearch
+        :param opening_book: opening book file (see OpeningBook), predict_step plays the book move before the model
+        """
         self.chess_row = chess_row
         self.chess_col = chess_col
+        optimizer_state = None
         if os.path.exists(model_file):
-            self.model = torch.load(model_file)
+            self.model, optimizer_state = load_checkpoint(model_file)
             logger.info(f"Load model from {model_file}!")
         else:
             self.model = Transformer(5, 10, chess_row)
@@ -22,15 +30,50 @@ class Transformer_Gobang(object):
             if not os.path.exists(os.path.dirname(model_file)):
                 os.mkdir(os.path.dirname(model_file))
         self.training = train
+        self.optimizer = None
         if not train:
             self.model.eval()
         if train:
             self.model.train()
-            self.optimizer = torch.optim.Adam(self.model.parameters(), lr=0.01)
+            self.optimizer = self.create_optimizer()
+            if optimizer_state is not None:
+                self.optimizer.load_state_dict(optimizer_state)
+
+        self.threat_search = ThreatSpaceSearch(chess_row, chess_col) if threat_search else None
+        self.opening_book = OpeningBook(chess_row, chess_col, opening_book) if opening_book is not None else None
+
+        # forward passes of concurrent predict_step calls are batched if the batcher is started
+        self.batcher = None
+        # float32 inputs of infer
+        self.input_buffers = None
 
         # test multiprocess
         self.process_num = 0
 
+    def __getstate__(self):
+        # the batcher thread is not copied to other processes, nor the optimizer: workers only play games,
+        # train creates a new optimizer if a copy is trained
+        state = self.__dict__.copy()
+        state["batcher"] = None
+        state["optimizer"] = None
+        return state
+
+    def create_optimizer(self):
+        return torch.optim.Adam(self.model.parameters(), lr=0.01)
+
+    def start_batcher(self, max_batch_size=64, max_wait=0.002):
+        """
+        batch the forward passes of predict_step calls from many threads, see InferenceBatcher
+        """
+        self.stop_batcher()
+        self.model.eval()
+        self.batcher = InferenceBatcher(self.model, max_batch_size, max_wait)
+
+    def stop_batcher(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+
     def add_process_num(self):
         self.process_num += 1
         print("process_num:", self.process_num)
@@ -41,31 +84,49 @@ class Transformer_Gobang(object):
     def predict_step(self, chessboard: ChessBoard, rule=True, first_random=True):
         if len(chessboard.steps) == 0 and first_random:
             return chessboard.get_random_first_step()
+        if self.opening_book is not None:
+            step = self.opening_book.probe(chessboard)
+            if step is not None:
+                return step
+        if rule and self.threat_search is not None:
+            step = self.threat_search.solve(chessboard.board, chessboard.current_player)
+            if step is not None:
+                return step
 
         board, me, oppo = chessboard.get_last_pred_window_output()
-        # print(f"----{len(chessboard.steps)}-----")
-        # print("board:", board.shape)
-        # print("me:", me.shape)
-        # print("oppo:", oppo.shape)
-        self.model.eval()
-        map = self.predict(board, me, oppo).detach().numpy()
-        assert map.shape[0] == 1, "predict batch size is not 1!"
-        map += chessboard.get_valid_board()
-        win_step = chessboard.search_current_player_certain_step()
-        if rule and len(win_step) > 0:
-            map[[0 for _ in win_step], [x[0] for x in win_step], [x[1] for x in win_step]] += 10
-            # print("map:", map)
-            # print("-"*20)
-            # for step in win_step:
-            #     print("step:", step, map[0, step[0], step[1]])
-        output = np.unravel_index(map.argmax(), map.shape)
-        return output[1:]
+        win_step = chessboard.search_current_player_certain_step() if rule else []
+        with torch.inference_mode():
+            if self.batcher is not None:
+                map = torch.from_numpy(self.batcher.predict(board, me, oppo))
+            else:
+                map = self.infer(board, me, oppo)
+            assert map.shape[0] == 1, "predict batch size is not 1!"
+            map += torch.from_numpy(chessboard.get_valid_board())
+            if len(win_step) > 0:
+                map[0, [x[0] for x in win_step], [x[1] for x in win_step]] += 10
+            index = int(map.argmax())
+        return divmod(index, map.shape[-1])
+
+    def infer(self, board, me, oppo) -> Tensor:
+        """
+        forward pass of predict_step, call it in torch.inference_mode. The model is switched to eval mode only if it
+        is in train mode, the inputs are copied into preallocated float32 buffers.
+        """
+        if self.model.training:
+            self.model.eval()
+        if self.input_buffers is None or self.input_buffers[0].shape != board.shape:
+            self.input_buffers = tuple(torch.empty(x.shape, dtype=torch.float32) for x in (board, me, oppo))
+        for buffer, x in zip(self.input_buffers, (board, me, oppo)):
+            buffer.copy_(torch.from_numpy(x))
+        return self.model(*self.input_buffers)
 
     def train(self, train_data, batch_size=256):
         board, me, oppo, step, label, w = train_data
         start = 0
         loss_ = -1
         self.model.train()
+        if self.optimizer is None:
+            self.optimizer = self.create_optimizer()
         while start < len(board):
             self.optimizer.zero_grad()
             map = self.predict(board[start: start + batch_size],
@@ -90,5 +151,6 @@ class Transformer_Gobang(object):
                 ).mean()
 
     def save_model(self, save_file="data/model.pkl"):
-        torch.save(self.model, save_file)
+        # 没有优化器(复制到其它进程的agent)时只保存模型
+        save_checkpoint(save_file, self.model, self.optimizer if self.training else None)
         print(f"model saved file: {save_file}")
@@ -0,0 +1,96 @@
+from concurrent.futures import Future
+from torch import nn
+import numpy as np
+import queue
+import threading
+import time
+import torch
+
+
+class InferenceBatcher(object):
+    """
+    Runs the forward passes of many games as one batch. Games in different threads submit the inputs of
+    get_last_pred_window_output, a worker thread stacks the waiting inputs and runs the model once when max_batch_size
+    inputs are waiting or the first one has waited max_wait seconds, then every caller gets its rows of the output.
+    """
+    def __init__(self, model: nn.Module, max_batch_size: int = 64, max_wait: float = 0.002):
+        """
+        :param model: model in eval mode
+        :param max_batch_size: max positions of one forward pass
+        :param max_wait: seconds the first waiting input waits for more inputs
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_num = 0
+        self.position_num = 0
+        self.queue = queue.Queue()
+        # 关闭后不再接收输入，锁保证关闭标志之后不会再有输入放入队列
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, board: np.ndarray, me: np.ndarray, oppo: np.ndarray) -> Future:
+        """
+        :param board, me, oppo: [n, ...] inputs of n positions, see ChessBoard.get_last_pred_window_output
+        :return: future of the [n, row, col] output
+        """
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("InferenceBatcher is closed!")
+            self.queue.put((board, me, oppo, future))
+        return future
+
+    def predict(self, board: np.ndarray, me: np.ndarray, oppo: np.ndarray) -> np.ndarray:
+        return self.submit(board, me, oppo).result()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        closed = False
+        while not closed:
+            request = self.queue.get()
+            if request is None:
+                break
+            requests = [request]
+            position_num = len(request[0])
+            deadline = time.time() + self.max_wait
+            while position_num < self.max_batch_size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    closed = True
+                    break
+                requests.append(request)
+                position_num += len(request[0])
+            self._forward(requests)
+
+    def _forward(self, requests):
+        try:
+            with torch.inference_mode():
+                inputs = [torch.from_numpy(np.concatenate([request[i] for request in requests])).float()
+                          for i in range(3)]
+                output = self.model(*inputs).numpy()
+        except Exception as e:
+            for request in requests:
+                request[3].set_exception(e)
+            return
+        self.batch_num += 1
+        self.position_num += len(output)
+        start = 0
+        for request in requests:
+            request[3].set_result(output[start:start + len(request[0])])
+            start += len(request[0])
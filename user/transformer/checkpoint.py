@@ -0,0 +1,61 @@
+from user.transformer.net import Transformer
+from torch import nn
+from typing import Optional, Tuple
+import inspect
+import os
+import pickle
+import torch
+
+# version 1: {"version", "hparams", "state_dict", "optimizer"}
+CHECKPOINT_VERSION = 1
+# torch >= 2.1: 加载时映射文件，load_state_dict直接使用加载的张量
+MMAP_LOAD = "mmap" in inspect.signature(torch.load).parameters
+ASSIGN_LOAD = "assign" in inspect.signature(nn.Module.load_state_dict).parameters
+
+
+def save_checkpoint(save_file: str, model: Transformer, optimizer: Optional[torch.optim.Optimizer] = None):
+    """
+    :param optimizer: its state is saved for resuming the training
+    """
+    # 先写临时文件再替换: 加载时映射了旧文件的进程不受影响，写到一半中断也不会损坏旧文件
+    tmp_file = f"{save_file}.tmp{os.getpid()}"
+    torch.save({
+        "version": CHECKPOINT_VERSION,
+        "hparams": model.get_hparams(),
+        "state_dict": model.state_dict(),
+        "optimizer": optimizer.state_dict() if optimizer is not None else None,
+    }, tmp_file)
+    os.replace(tmp_file, save_file)
+
+
+def _load(model_file: str):
+    if not MMAP_LOAD:
+        return torch.load(model_file, map_location="cpu")
+    try:
+        # 张量直接映射到文件，多个进程共用页缓存
+        return torch.load(model_file, map_location="cpu", mmap=True, weights_only=True)
+    except (pickle.UnpicklingError, RuntimeError):
+        # 旧格式: torch.save(model)保存的整个模型，weights_only不能加载
+        return torch.load(model_file, map_location="cpu", weights_only=False)
+
+
+def load_checkpoint(model_file: str) -> Tuple[Transformer, Optional[dict]]:
+    """
+    load a checkpoint of save_checkpoint, or an old file of the pickled model
+    :return: model, optimizer state (None if it is not saved)
+    """
+    checkpoint = _load(model_file)
+    if isinstance(checkpoint, nn.Module):
+        return checkpoint, None
+    if checkpoint.get("version", 0) > CHECKPOINT_VERSION:
+        raise ValueError(f"checkpoint version {checkpoint.get('version')} of {model_file} is newer than "
+                         f"{CHECKPOINT_VERSION}!")
+    if ASSIGN_LOAD:
+        # 在meta设备上建立模型，参数直接使用映射的张量，不再复制
+        with torch.device("meta"):
+            model = Transformer(**checkpoint["hparams"])
+        model.load_state_dict(checkpoint["state_dict"], assign=True)
+    else:
+        model = Transformer(**checkpoint["hparams"])
+        model.load_state_dict(checkpoint["state_dict"])
+    return model, checkpoint["optimizer"]
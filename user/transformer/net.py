@@ -21,6 +21,7 @@ class Transformer(nn.Module):
         self.emb_dim_2d = emb_dim_2d
         self.src_size = src_size
         self.tgt_size = tgt_size
+        self.dropout_prob = dropout_prob
 
         # layers
         encoder_layer = TransformerEncoderLayer(src_size, src_size, emb_dim_2d, dropout_prob)
@@ -30,6 +31,15 @@ class Transformer(nn.Module):
         decoder_layer2 = TransformerDecoderLayer(tgt_size, src_size, emb_dim_2d, dropout_prob)
         self.decoder2 = TransformerDecoder(decoder_layer2, num_decoder_layers)
 
+    def get_hparams(self) -> dict:
+        """
+        arguments of __init__, saved in the checkpoints
+        """
+        return dict(tgt_size=self.tgt_size, src_size=self.src_size, emb_dim_2d=self.emb_dim_2d,
+                    num_encoder_layers=self.encoder.num_layers, num_decoder_layers=self.decoder1.num_layers,
+                    # pickled modules of old versions have no dropout_prob
+                    dropout_prob=getattr(self, "dropout_prob", 0.1))
+
     def forward(
             self,
             src: Tensor,